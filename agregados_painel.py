@@ -0,0 +1,123 @@
+# -*- coding: utf-8 -*-
+
+# ==============================================================================
+# AGREGADOS PARA O PAINEL (PÁGINA DE DESEMPENHO)
+# ==============================================================================
+# Compartilhado pelo ETL (conexao_api_trier_sgf), que recria os agregados logo depois de
+# gravar 'vendas_processadas', e pelo painel (app), que usa a versão do banco para invalidar
+# seus caches e, ao iniciar, só cria as tabelas de agregados que faltarem. Fica em um módulo
+# à parte para que o painel não precise importar o ETL (sessão HTTP, engine própria etc.).
+# ==============================================================================
+import os  # Para ler a data de modificação dos arquivos do banco.
+import threading  # Para impedir recriações simultâneas dos agregados.
+
+# Importa as configurações globais (caminhos de arquivo).
+import config_conexao as cfg
+
+# Tabelas pequenas com as vendas 'OK' já somadas por dia, recriadas a partir de
+# 'vendas_processadas' logo depois que ela é gravada. O painel lê estas tabelas em vez de
+# agrupar todas as vendas a cada requisição.
+
+_agregados_lock = threading.Lock()  # Impede que duas recriações dos agregados rodem ao mesmo tempo.
+
+
+def versao_banco() -> tuple:
+    """
+    Retorna a data de modificação do arquivo do banco (e do arquivo WAL, se existir).
+    Sempre que alguém grava dados, a versão muda (usada pelo painel para invalidar caches).
+
+    Returns:
+        tuple: (mtime do banco, mtime do WAL), em nanossegundos; None para arquivos ausentes.
+    """
+    versao = []
+    for caminho in (cfg.DATABASE_FILE, f'{cfg.DATABASE_FILE}-wal'):
+        try:
+            versao.append(os.stat(caminho).st_mtime_ns)
+        except OSError:
+            versao.append(None)
+    return tuple(versao)
+
+
+# Arquivo com a versão do esquema (VERSAO_ESQUEMA_AGREGADOS) da última recriação dos agregados.
+# Fica em disco para ser compartilhado entre os processos (workers) do servidor WSGI.
+ARQUIVO_VERSAO_AGREGADOS = os.path.join(cfg.DATA_DIR, '.versao_agregados')
+
+AGREGADOS_DESEMPENHO = {
+    # Receita e itens por dia e hora: KPIs, evolução da receita e mapa de calor.
+    # O dia da semana (0 = segunda-feira, como no pandas) é calculado aqui, uma vez por dia,
+    # e não convertendo as datas de texto a cada requisição.
+    'agg_vendas_dia_hora': """
+        SELECT substr(dataEmissao, 1, 10) AS dia,
+               COALESCE(CAST(substr(horaEmissao, 1, 2) AS INTEGER), 0) AS hora,
+               (CAST(strftime('%w', substr(dataEmissao, 1, 10)) AS INTEGER) + 6) % 7 AS dia_semana,
+               SUM(valorTotalLiquido) AS receita,
+               SUM(quantidadeProdutos) AS itens
+        FROM vendas_processadas WHERE status_venda = 'OK' GROUP BY 1, 2, 3""",
+    # Notas distintas por dia (cada nota pertence a um único dia, então as contagens somam).
+    'agg_vendas_dia_notas': """
+        SELECT substr(dataEmissao, 1, 10) AS dia, COUNT(DISTINCT numeroNota) AS notas
+        FROM vendas_processadas WHERE status_venda = 'OK' GROUP BY 1""",
+    # Receita por dia e vendedor: Top 5 Vendedores.
+    'agg_vendas_dia_vendedor': """
+        SELECT substr(dataEmissao, 1, 10) AS dia, nomeVendedor, SUM(valorTotalLiquido) AS receita
+        FROM vendas_processadas WHERE status_venda = 'OK' AND nomeVendedor IS NOT NULL GROUP BY 1, 2""",
+    # Receita por dia e grupo de produtos: Top 5 Categorias.
+    'agg_vendas_dia_grupo': """
+        SELECT substr(dataEmissao, 1, 10) AS dia, nomeGrupo, SUM(valorTotalLiquido) AS receita
+        FROM vendas_processadas WHERE status_venda = 'OK' AND nomeGrupo IS NOT NULL GROUP BY 1, 2""",
+}
+
+# Incrementar sempre que as consultas acima mudarem, para forçar a recriação das tabelas.
+VERSAO_ESQUEMA_AGREGADOS = 2
+
+
+def _ler_versao_agregados() -> str:
+    """Retorna a versão do esquema gravada na última recriação dos agregados (ou None, se não houver)."""
+    try:
+        with open(ARQUIVO_VERSAO_AGREGADOS, 'r', encoding='utf-8') as f:
+            return f.read()
+    except OSError:
+        return None
+
+
+def _agregados_existem(engine) -> bool:
+    """Verifica se todas as tabelas de agregados existem no banco."""
+    with engine.connect() as conn:
+        existentes = {nome for (nome,) in conn.exec_driver_sql(
+            "SELECT name FROM sqlite_master WHERE type = 'table' AND name LIKE 'agg_%'")}
+    return existentes.issuperset(AGREGADOS_DESEMPENHO)
+
+
+def atualizar_agregados(engine, forcar: bool = False):
+    """
+    Recria as tabelas de agregados da página de Desempenho. Sem 'forcar', só recria se
+    faltar alguma tabela ou se as consultas mudaram (VERSAO_ESQUEMA_AGREGADOS): quem mantém
+    os agregados em dia com os dados é o ETL, que recria tudo logo depois de gravar as vendas.
+    Todas as tabelas são trocadas em uma única transação, então as consultas nunca veem os
+    agregados pela metade.
+
+    Args:
+        engine: A engine SQLAlchemy do processo que chama (ETL ou painel).
+        forcar (bool): Recria mesmo que as tabelas existam e estejam no esquema atual.
+    """
+    with _agregados_lock:
+        if not forcar and _ler_versao_agregados() == str(VERSAO_ESQUEMA_AGREGADOS) and _agregados_existem(engine):
+            return
+
+        script = ['BEGIN IMMEDIATE;']
+        for nome_tabela, sql in AGREGADOS_DESEMPENHO.items():
+            script.append(f'DROP TABLE IF EXISTS {nome_tabela};')
+            script.append(f'CREATE TABLE {nome_tabela} AS {sql};')
+            script.append(f'CREATE INDEX idx_{nome_tabela}_dia ON {nome_tabela} (dia);')
+        script.append('COMMIT;')
+
+        conn = engine.raw_connection()
+        try:
+            conn.driver_connection.executescript('\n'.join(script))
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            conn.close()
+        with open(ARQUIVO_VERSAO_AGREGADOS, 'w', encoding='utf-8') as f:
+            f.write(str(VERSAO_ESQUEMA_AGREGADOS))
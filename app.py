@@ -5,14 +5,27 @@
 # ==============================================================================
 # Importa as bibliotecas necessárias para o funcionamento da aplicação.
 import pandas as pd  # Usado para manipulação e análise de dados em DataFrames.
-from flask import Flask, render_template, jsonify, request  # Componentes do Flask para criar o servidor web, renderizar páginas e manipular requisições.
+import numpy as np  # Usado para cálculos vetorizados sobre os arrays das colunas.
+from flask import Flask, g, has_request_context, render_template, request  # Componentes do Flask para criar o servidor web, renderizar páginas e manipular requisições.
 import os  # Usado para interagir com o sistema operacional, como criar diretórios.
-import json  # Usado para trabalhar com dados no formato JSON.
+import gzip  # Para comprimir as respostas JSON enviadas ao navegador.
 import logging  # Para registrar informações, avisos e erros da aplicação.
 from datetime import datetime, timedelta  # Para trabalhar com datas e horas, usado no cache e filtros.
+from functools import wraps  # Para preservar o nome das rotas ao aplicar o decorador de cache.
+from sqlalchemy import create_engine, event  # Para manter uma única conexão (engine) reutilizável com o banco SQLite.
+from sqlalchemy.exc import OperationalError  # Erro do banco ao consultar uma tabela inexistente.
+import orjson  # Serialização JSON rápida (e compatível com tipos do numpy) para as respostas da API.
+from flask.json.provider import DefaultJSONProvider  # Base para trocar o codificador JSON do Flask.
 
 # Importa as configurações de conexão, como o caminho do banco de dados.
 import config_conexao as cfg
+# Versão dos dados e recriação dos agregados, compartilhadas com o ETL (sem importar o ETL).
+from agregados_painel import atualizar_agregados, versao_banco
+
+# Ativa o Copy-on-Write do pandas: filtros e seleções passam a compartilhar memória com
+# o DataFrame de origem e só são copiados se forem alterados. Assim os DataFrames em
+# cache podem ser entregues às rotas diretamente, sem cópias defensivas.
+pd.set_option('mode.copy_on_write', True)
 
 # ==============================================================================
 # INICIALIZAÇÃO DA APLICAÇÃO FLASK
@@ -20,60 +33,233 @@ import config_conexao as cfg
 # Cria uma instância da aplicação Flask.
 app = Flask(__name__)
 
+
+class OrjsonProvider(DefaultJSONProvider):
+    """
+    Provedor JSON do Flask baseado no orjson. Aceita diretamente os tipos do numpy e do
+    pandas (datas), sem converter os DataFrames para texto e de volta para Python.
+    """
+    opcoes = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NAIVE_UTC | orjson.OPT_NON_STR_KEYS
+
+    def dumps(self, obj, **kwargs):
+        opcoes = self.opcoes | (orjson.OPT_SORT_KEYS if self.sort_keys else 0)
+        return orjson.dumps(obj, default=self.default, option=opcoes).decode('utf-8')
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        # Mesmo comportamento do 'jsonify', mas gerando os bytes diretamente com o orjson.
+        dados = self._prepare_response_obj(args, kwargs)
+        opcoes = self.opcoes | (orjson.OPT_SORT_KEYS if self.sort_keys else 0)
+        return self._app.response_class(
+            orjson.dumps(dados, default=self.default, option=opcoes), mimetype=self.mimetype
+        )
+
+
+# Todo JSON gerado pelo Flask (jsonify, request.get_json etc.) passa a usar o orjson.
+app.json = OrjsonProvider(app)
+
 # ==============================================================================
 # CONFIGURAÇÃO DO CACHE EM MEMÓRIA
 # ==============================================================================
 # Variáveis globais para armazenar os dados em cache e controlar sua validade.
 # Isso evita a leitura do banco de dados a cada requisição, melhorando o desempenho.
 _df_final_cache = None       # Armazena o DataFrame de vendas processadas.
+_df_ok_cache = None          # Armazena apenas as vendas com status 'OK' (usadas por todos os gráficos).
 _df_vendedores_cache = None  # Armazena o DataFrame de vendedores.
 _df_produtos_cache = None     # Armazena o DataFrame de produtos (agora compartilhado).
 _cache_timestamp = None      # Guarda o momento em que o cache de vendas foi criado.
+_cache_versao = None         # Versão do banco (ver versao_banco) lida na carga do cache de vendas.
 
 # --- NOVO: Cache para dados de Compras ---
 _df_compras_cache = None      # Armazena o DataFrame de compras.
 _df_fornecedores_cache = None # Armazena o DataFrame de fornecedores.
 _compras_cache_timestamp = None # Guarda o momento em que o cache de compras foi criado.
+_compras_cache_versao = None    # Versão do banco lida na carga do cache de compras.
+
+# --- Cache dos dicionários código -> nome (fornecedores e produtos) ---
+_mapas_nomes_cache = {}       # Mapeia a coluna de nome -> (DataFrame de origem, dicionário código -> nome).
+
+# --- Cache dos indicadores de estoque (independentes do período) ---
+_indicadores_estoque_cache = None  # (DataFrame de produtos de origem, dicionário de indicadores).
 
 CACHE_DURATION_MINUTES = 5   # Define o tempo de validade do cache em minutos.
 
+# --- Cache das respostas JSON já serializadas ---
+# Mapeia (rota, parâmetros da URL, versão dos dados) -> (momento de expiração, corpo JSON, corpo gzip).
+# Recarregar o painel com o mesmo período vira uma simples consulta a este dicionário.
+_respostas_cache = {}
+
+# --- Compressão das respostas JSON ---
+COMPRESSAO_NIVEL = 5             # Nível do gzip (1 a 9): bom equilíbrio entre tamanho e tempo de CPU.
+COMPRESSAO_TAMANHO_MINIMO = 1024 # Respostas menores que isso (em bytes) são enviadas sem compressão.
+
+# ==============================================================================
+# CONEXÃO COM O BANCO DE DADOS
+# ==============================================================================
+# Engine criada uma única vez e compartilhada por todas as leituras, em vez de
+# montar a string de conexão a cada chamada.
+engine = create_engine(f'sqlite:///{cfg.DATABASE_FILE}', connect_args={'check_same_thread': False})
+
+
+@event.listens_for(engine, 'connect')
+def _configurar_conexao(conexao_dbapi, _registro):
+    """
+    Ajusta cada nova conexão SQLite do pool. Como as conexões são reaproveitadas,
+    isto roda uma única vez por conexão, e não a cada leitura.
+    """
+    cursor = conexao_dbapi.cursor()
+    try:
+        # WAL: as leituras do painel não bloqueiam as gravações do orquestrador (e vice-versa).
+        cursor.execute('PRAGMA journal_mode=WAL')
+    except Exception as e:
+        logging.warning(f"Não foi possível ativar o modo WAL no banco: {e}")
+    cursor.execute('PRAGMA mmap_size=268435456')  # Lê o arquivo via memória mapeada (até 256 MB).
+    cursor.execute('PRAGMA cache_size=-65536')    # Cache de páginas de 64 MB por conexão.
+    cursor.execute('PRAGMA temp_store=MEMORY')    # Tabelas temporárias (ex: de GROUP BY) em memória.
+    cursor.close()
+
+# Colunas de cada tabela que são realmente usadas pelas páginas e APIs.
+# Ler apenas estas colunas reduz o volume lido do disco e a memória do cache.
+COLUNAS_VENDAS = (
+    'numeroNota', 'dataEmissao', 'horaEmissao', 'codigoVendedor', 'nomeVendedor', 'codigoCliente',
+    'entrega', 'condicaoPagamento_nome', 'numeroNotaFiscal', 'status_venda', 'numeroNotaOrigem',
+    'codigoProduto', 'nome', 'nomeGrupo', 'nomeCategoria', 'quantidadeProdutos',
+    'valorTotalCusto', 'valorTotalBruto', 'valorTotalLiquido'
+)
+COLUNAS_PRODUTOS = ('codigo', 'nome', 'ativo', 'quantidadeEstoque', 'valorCustoMedio', 'valorCusto')
+COLUNAS_COMPRAS = ('numeroNotaFiscal', 'dataEntrada', 'codigoFornecedor', 'valorTotalNota', 'valorTotalProdutos', 'itens')
+COLUNAS_FORNECEDORES = ('codigo', 'nomeFantasia')
+
+# Número de linhas lidas por vez nas tabelas grandes. Ler em blocos evita que todas as
+# linhas passem de uma só vez por listas Python antes de virarem um DataFrame.
+LEITURA_CHUNKSIZE = 200_000
+
+
+def _ler_colunas(nome_tabela, colunas=None, where='', params=(), chunksize=None):
+    """
+    Lê uma tabela do banco trazendo apenas as colunas pedidas e aplicando um
+    filtro WHERE opcional (com parâmetros), para que o SQLite faça o trabalho
+    de projeção e filtragem antes de os dados chegarem ao pandas.
+    Com 'chunksize', a leitura é feita em blocos desse número de linhas, que são
+    concatenados no final (reduz o pico de memória nas tabelas grandes).
+    Colunas pedidas que não existem na tabela são ignoradas.
+    Lança ValueError se a tabela não existir, assim como o 'pd.read_sql_table'.
+    """
+    with engine.connect() as conn:
+        colunas_tabela = [linha[1] for linha in conn.exec_driver_sql(f'PRAGMA table_info("{nome_tabela}")')]
+        if not colunas_tabela:
+            raise ValueError(f"Table {nome_tabela} not found")
+
+        colunas_select = colunas_tabela if colunas is None else [col for col in colunas if col in colunas_tabela]
+        colunas_sql = ', '.join(f'"{col}"' for col in colunas_select)
+        sql = f'SELECT {colunas_sql} FROM "{nome_tabela}" {where}'
+        if chunksize:
+            return pd.concat(pd.read_sql_query(sql, conn, params=tuple(params), chunksize=chunksize), ignore_index=True)
+        return pd.read_sql_query(sql, conn, params=tuple(params))
+
+
+def _garantir_indices():
+    """
+    Cria (se ainda não existir) o índice por data e status da tabela analítica.
+    A tabela 'vendas_processadas' é recriada pelo orquestrador, então a verificação
+    é feita a cada recarga do cache.
+    """
+    try:
+        with engine.begin() as conn:
+            conn.exec_driver_sql(
+                "CREATE INDEX IF NOT EXISTS idx_vendas_processadas_data_status "
+                "ON vendas_processadas (dataEmissao, status_venda)"
+            )
+    except Exception as e:
+        logging.warning(f"Não foi possível criar o índice de 'vendas_processadas': {e}")
+
+
+def _existem_vendas():
+    """
+    Verifica direto no banco se há vendas processadas, sem carregar a tabela.
+    Usado pelas rotas que consultam o banco e não precisam do DataFrame em memória.
+    """
+    try:
+        with engine.connect() as conn:
+            return conn.exec_driver_sql("SELECT 1 FROM vendas_processadas LIMIT 1").first() is not None
+    except Exception as e:
+        logging.warning(f"Aviso ao verificar as vendas processadas: {e}. A tabela pode não existir.")
+        return False
+
 # ==============================================================================
 # FUNÇÕES DE CARREGAMENTO E PROCESSAMENTO DE DADOS
 # ==============================================================================
+def _preparar_produtos(df_produtos):
+    """
+    Ajusta os tipos da tabela de produtos uma única vez, antes de ir para o cache:
+    'codigo' como texto (mesmo tipo de 'codigoProduto' nas vendas) e 'ativo' como booleano.
+    """
+    if 'codigo' in df_produtos.columns:
+        df_produtos['codigo'] = df_produtos['codigo'].astype(str)
+    if 'ativo' in df_produtos.columns:
+        df_produtos['ativo'] = df_produtos['ativo'] == True
+    return df_produtos
+
+
+def _registrar_dados_usados(fonte, versao, carregado_em):
+    """
+    Anota, na requisição atual, a versão e o horário de carga dos dados entregues por um
+    dos caches ('vendas', 'compras' ou 'banco'). O cache_resposta usa essas anotações para
+    guardar cada resposta com a versão dos dados de que ela foi montada. Versão None indica
+    falha na carga: a resposta não é guardada.
+    """
+    if has_request_context():
+        g.setdefault('dados_usados', {})[fonte] = (versao, carregado_em)
+
+
 def carregar_e_processar_dados():
     """
     Carrega os dados de VENDAS, VENDEDORES e PRODUTOS do banco de dados SQLite.
     Implementa um sistema de cache para evitar leituras repetidas do banco.
     Aplica a lógica de negócio para negativar valores de devolução e enriquece
     os dados de vendas com informações dos produtos (categoria).
+    Retorna (vendas, vendas com status 'OK', vendedores).
     """
     # Torna as variáveis de cache globais acessíveis dentro da função.
-    global _df_final_cache, _df_vendedores_cache, _df_produtos_cache, _cache_timestamp
+    global _df_final_cache, _df_ok_cache, _df_vendedores_cache, _df_produtos_cache, _cache_timestamp, _cache_versao
 
     # 1. VERIFICAÇÃO DO CACHE
     if _df_final_cache is not None and _cache_timestamp is not None:
         cache_age = datetime.now() - _cache_timestamp
         if cache_age < timedelta(minutes=CACHE_DURATION_MINUTES):
-            # Retorna cópias para evitar modificações acidentais no cache.
-            return _df_final_cache.copy(), _df_vendedores_cache.copy()
+            # Retorna os próprios DataFrames do cache: as rotas não os alteram (Copy-on-Write).
+            _registrar_dados_usados('vendas', _cache_versao, _cache_timestamp)
+            return _df_final_cache, _df_ok_cache, _df_vendedores_cache
+        # Prazo vencido, mas o banco não mudou desde a carga: renova o prazo sem reler nem reprocessar.
+        if versao_banco() == _cache_versao:
+            _cache_timestamp = datetime.now()
+            _registrar_dados_usados('vendas', _cache_versao, _cache_timestamp)
+            return _df_final_cache, _df_ok_cache, _df_vendedores_cache
 
     # 2. CARREGAMENTO DOS DADOS
-    conn_str = f'sqlite:///{cfg.DATABASE_FILE}'
     df_final = pd.DataFrame()
     df_vendedores = pd.DataFrame()
     df_produtos = pd.DataFrame()
 
     try:
-        df_final = pd.read_sql_table('vendas_processadas', conn_str)
-        df_vendedores = pd.read_sql_table('vendedores', conn_str)
-        df_produtos = pd.read_sql_table('produtos', conn_str) # Carrega os dados de produtos
+        _garantir_indices()
+        # Versão lida antes dos dados: uma gravação durante a leitura força nova carga no próximo prazo.
+        versao = versao_banco()
+        # Lê apenas as colunas usadas pelas páginas, deixando a projeção a cargo do SQLite.
+        df_final = _ler_colunas('vendas_processadas', COLUNAS_VENDAS, chunksize=LEITURA_CHUNKSIZE)
+        df_vendedores = _ler_colunas('vendedores')
+        df_produtos = _preparar_produtos(_ler_colunas('produtos', COLUNAS_PRODUTOS)) # Carrega os dados de produtos
         logging.info(f"Carregados {len(df_final)} registros de vendas, {len(df_vendedores)} vendedores e {len(df_produtos)} produtos do banco.")
     except ValueError as e:
         logging.warning(f"Aviso ao carregar dados de vendas: {e}. Uma das tabelas pode não existir.")
-        return pd.DataFrame(), pd.DataFrame()
+        _registrar_dados_usados('vendas', None, None)
+        return pd.DataFrame(), pd.DataFrame(), pd.DataFrame()
     except Exception as e:
         logging.error(f"Erro crítico ao ler tabelas de vendas: {e}", exc_info=True)
-        return pd.DataFrame(), pd.DataFrame()
+        _registrar_dados_usados('vendas', None, None)
+        return pd.DataFrame(), pd.DataFrame(), pd.DataFrame()
 
     colunas_para_ajuste = ['valorTotalCusto', 'valorTotalBruto', 'valorTotalLiquido', 'quantidadeProdutos']
     
@@ -81,24 +267,108 @@ def carregar_e_processar_dados():
     if 'numeroNotaOrigem' not in df_final.columns:
         df_final['numeroNotaOrigem'] = None
 
+    # Apenas DEVOLUÇÃO deve ter valores negativos. A máscara é calculada uma única vez
+    # (a comparação de texto percorre todas as linhas) e reaproveitada em cada coluna.
+    devolucoes = (df_final['status_venda'] == 'DEVOLUÇÃO').to_numpy()
     for col in colunas_para_ajuste:
         if col in df_final.columns:
-            df_final[col] = pd.to_numeric(df_final[col], errors='coerce').fillna(0)
-            
-            # Apenas DEVOLUÇÃO deve ter valores negativos
-            devolucoes = (df_final['status_venda'] == 'DEVOLUÇÃO')
-            df_final.loc[devolucoes, col] = -df_final.loc[devolucoes, col].abs()
+            valores = pd.to_numeric(df_final[col], errors='coerce').fillna(0).to_numpy(copy=True)
+            valores[devolucoes] = -np.abs(valores[devolucoes])
+            df_final[col] = valores
             
             # Para 'Excluída', mantemos o valor como está (positivo, vindo do banco) 
             # para exibição na tabela de conferência. O filtro do gráfico remove 'Excluída'.
 
+    # Converte a data e extrai a hora uma única vez, no carregamento, para que as rotas
+    # filtrem e agrupem com comparações vetorizadas em vez de operações de texto por linha.
+    df_final['dataEmissao'] = pd.to_datetime(df_final['dataEmissao'], format='ISO8601', errors='coerce', cache=True)
+    if 'horaEmissao' in df_final.columns:
+        df_final['hora'] = pd.to_numeric(df_final['horaEmissao'].str.slice(0, 2), errors='coerce').fillna(0).astype('int8')
+
+    # Ordena as vendas por data (datas vazias ficam no final) para que os filtros de período
+    # sejam fatias localizadas por busca binária (ver _filtrar_periodo). A ordenação estável
+    # mantém a ordem original dos itens de cada nota.
+    # O ETL já grava a tabela nessa ordem; então basta conferir, sem reordenar.
+    if not df_final['dataEmissao'].is_monotonic_increasing:
+        df_final = df_final.sort_values('dataEmissao', kind='stable', na_position='last', ignore_index=True)
+
+    # Guarda a data já no texto 'AAAA-MM-DD' enviado à página, como 'category': só os dias
+    # distintos são formatados (uma vez, no carregamento), e não cada linha a cada requisição.
+    dias_emissao = df_final['dataEmissao'].dt.normalize().astype('category')
+    df_final['diaEmissao'] = dias_emissao.cat.rename_categories(dias_emissao.cat.categories.strftime('%Y-%m-%d'))
+
+    # Colunas de texto muito repetidas viram 'category': os agrupamentos passam a operar
+    # sobre códigos inteiros em vez de comparar strings, e o cache ocupa menos memória.
+    # O 'numeroNota' (repetido em cada item da nota) também, para contar as notas distintas
+    # pelas categorias em uso em vez de recalcular o hash de todas as linhas. Os códigos de
+    # produto e vendedor e a hora (texto) se repetem do mesmo jeito.
+    # Os valores monetários continuam em float64: em float32 as somas perderiam centavos.
+    for col in ('condicaoPagamento_nome', 'nomeVendedor', 'entrega', 'nomeGrupo', 'nomeCategoria', 'nome', 'status_venda', 'numeroNota',
+                'codigoProduto', 'codigoVendedor', 'horaEmissao'):
+        if col in df_final.columns:
+            df_final[col] = df_final[col].astype('category')
+
+    # Separa uma única vez as vendas 'OK', usadas por todos os gráficos. Continua ordenado
+    # por data, então os filtros de período também funcionam sobre ele.
+    df_ok = df_final[df_final['status_venda'] == 'OK'].reset_index(drop=True)
+
     # 3. ATUALIZAÇÃO DO CACHE
     _df_final_cache = df_final
+    _df_ok_cache = df_ok
     _df_vendedores_cache = df_vendedores
     _df_produtos_cache = df_produtos # Armazena o df de produtos no cache compartilhado
     _cache_timestamp = datetime.now()
+    _cache_versao = versao
+    _registrar_dados_usados('vendas', _cache_versao, _cache_timestamp)
     
-    return df_final.copy(), df_vendedores.copy()
+    return df_final, df_ok, df_vendedores
+
+
+def _filtrar_periodo(df, data_inicio, data_fim):
+    """
+    Filtra o DataFrame de vendas pelo período informado (datas 'AAAA-MM-DD', inclusivas).
+    Se alguma das datas não for informada, retorna o DataFrame sem filtro; se alguma for
+    inválida, retorna o período vazio (como a antiga comparação de textos fazia).
+    O DataFrame deve estar ordenado por 'dataEmissao' (como o do cache): o período é
+    localizado por busca binária e devolvido como uma fatia contínua, sem máscara booleana.
+    """
+    if not (data_inicio and data_fim):
+        return df
+    try:
+        # As datas vêm da URL sem validação: só o formato 'AAAA-MM-DD' é aceito.
+        inicio_periodo = np.datetime64(datetime.strptime(data_inicio, '%Y-%m-%d'))
+        fim_periodo = np.datetime64(datetime.strptime(data_fim, '%Y-%m-%d'))
+    except ValueError:
+        return df.iloc[0:0]
+    datas = df['dataEmissao'].to_numpy()
+    inicio = np.searchsorted(datas, inicio_periodo, side='left')
+    fim = np.searchsorted(datas, fim_periodo, side='right')
+    return df.iloc[inicio:fim]
+
+
+def _somar_por(resumo, coluna, valor='valorTotalLiquido'):
+    """
+    Soma a coluna de valor de um resumo já agrupado, reduzindo-o a uma única dimensão.
+    Linhas com a dimensão vazia são descartadas, como em um agrupamento direto.
+    """
+    return resumo.groupby(coluna, observed=True)[valor].sum()
+
+
+def _somar_por_categoria(df, coluna, valor='valorTotalLiquido'):
+    """
+    Soma a coluna de valor por uma coluna 'category', direto sobre os códigos inteiros das
+    categorias (np.bincount), sem a tabela de hash de um agrupamento. O resultado é o mesmo
+    de 'groupby(coluna, observed=True)[valor].sum()': só as categorias presentes, em ordem.
+    """
+    if not isinstance(df[coluna].dtype, pd.CategoricalDtype):
+        return df.groupby(coluna, observed=True)[valor].sum()
+    categorias = df[coluna].cat.categories
+    codigos = df[coluna].cat.codes.to_numpy()
+    validos = codigos >= 0  # -1 = valor vazio, descartado como no agrupamento.
+    codigos = codigos[validos]
+    somas = np.bincount(codigos, weights=df[valor].to_numpy()[validos], minlength=len(categorias))
+    presentes = np.bincount(codigos, minlength=len(categorias)) > 0
+    return pd.Series(somas[presentes], index=categorias[presentes], name=valor)
 
 
 # --- Função de carregamento de dados para a página de Compras ---
@@ -107,42 +377,242 @@ def carregar_dados_compras():
     Carrega os dados de COMPRAS, FORNECEDORES e PRODUTOS do banco de dados SQLite.
     Implementa um sistema de cache dedicado para estas tabelas.
     """
-    global _df_compras_cache, _df_fornecedores_cache, _df_produtos_cache, _compras_cache_timestamp
+    global _df_compras_cache, _df_fornecedores_cache, _df_produtos_cache, _compras_cache_timestamp, _compras_cache_versao
 
     # 1. VERIFICAÇÃO DO CACHE
     if _df_compras_cache is not None and _compras_cache_timestamp is not None:
         cache_age = datetime.now() - _compras_cache_timestamp
         if cache_age < timedelta(minutes=CACHE_DURATION_MINUTES):
-            return _df_compras_cache.copy(), _df_fornecedores_cache.copy(), _df_produtos_cache.copy()
+            _registrar_dados_usados('compras', _compras_cache_versao, _compras_cache_timestamp)
+            return _df_compras_cache, _df_fornecedores_cache, _df_produtos_cache
+        # Prazo vencido, mas o banco não mudou desde a carga: renova o prazo sem reler.
+        if versao_banco() == _compras_cache_versao:
+            _compras_cache_timestamp = datetime.now()
+            _registrar_dados_usados('compras', _compras_cache_versao, _compras_cache_timestamp)
+            return _df_compras_cache, _df_fornecedores_cache, _df_produtos_cache
 
     # 2. CARREGAMENTO DOS DADOS
-    conn_str = f'sqlite:///{cfg.DATABASE_FILE}'
     df_compras, df_fornecedores, df_produtos = pd.DataFrame(), pd.DataFrame(), pd.DataFrame()
 
     try:
-        df_compras = pd.read_sql_table('compras', conn_str)
-        df_fornecedores = pd.read_sql_table('fornecedores', conn_str)
+        versao = versao_banco()
+        df_compras = _ler_colunas('compras', COLUNAS_COMPRAS, chunksize=LEITURA_CHUNKSIZE)
+        df_fornecedores = _ler_colunas('fornecedores', COLUNAS_FORNECEDORES)
+        # Os códigos de fornecedor já ficam como texto no cache, prontos para a busca dos nomes.
+        df_fornecedores['codigo'] = df_fornecedores['codigo'].astype(str)
+        df_compras['codigoFornecedor'] = df_compras['codigoFornecedor'].astype(str)
         
         # Reutiliza o cache de produtos se já tiver sido carregado pela função de vendas
         if _df_produtos_cache is not None and (datetime.now() - _cache_timestamp) < timedelta(minutes=CACHE_DURATION_MINUTES):
-             df_produtos = _df_produtos_cache.copy()
+             df_produtos = _df_produtos_cache
         else:
-            df_produtos = pd.read_sql_table('produtos', conn_str)
-            _df_produtos_cache = df_produtos.copy() # Atualiza o cache compartilhado
+            df_produtos = _preparar_produtos(_ler_colunas('produtos', COLUNAS_PRODUTOS))
+            _df_produtos_cache = df_produtos # Atualiza o cache compartilhado
 
         logging.info(f"Carregados {len(df_compras)} registros de compras, {len(df_fornecedores)} fornecedores e {len(df_produtos)} produtos.")
     except ValueError as e:
         logging.warning(f"Aviso ao carregar dados de compras: {e}. Uma das tabelas pode não existir.")
     except Exception as e:
         logging.error(f"Erro crítico ao ler tabelas de compras: {e}", exc_info=True)
+        _registrar_dados_usados('compras', None, None)
         return pd.DataFrame(), pd.DataFrame(), pd.DataFrame()
 
     # 3. ATUALIZAÇÃO DO CACHE
     _df_compras_cache = df_compras
     _df_fornecedores_cache = df_fornecedores
     _compras_cache_timestamp = datetime.now()
+    _compras_cache_versao = versao
+    _registrar_dados_usados('compras', _compras_cache_versao, _compras_cache_timestamp)
     
-    return df_compras.copy(), df_fornecedores.copy(), df_produtos.copy()
+    return df_compras, df_fornecedores, df_produtos
+
+
+def _mapa_nomes(df, coluna_nome):
+    """
+    Retorna um dicionário código -> nome a partir do DataFrame informado (com 'codigo' já
+    como texto). O dicionário é reaproveitado enquanto o DataFrame em cache for o mesmo objeto.
+    """
+    item = _mapas_nomes_cache.get(coluna_nome)
+    if item is not None and item[0] is df:
+        return item[1]
+
+    mapa = {}
+    if 'codigo' in df.columns and coluna_nome in df.columns:
+        mapa = dict(zip(df['codigo'], df[coluna_nome]))
+    _mapas_nomes_cache[coluna_nome] = (df, mapa)
+    return mapa
+
+
+def _indicadores_estoque(df_produtos):
+    """
+    Calcula os indicadores de estoque que não dependem do período selecionado: produtos
+    ativos (e seus códigos), valor do estoque a custo e níveis de estoque. O resultado é
+    reaproveitado enquanto o DataFrame de produtos em cache for o mesmo objeto.
+    """
+    global _indicadores_estoque_cache
+    if _indicadores_estoque_cache is not None and _indicadores_estoque_cache[0] is df_produtos:
+        return _indicadores_estoque_cache[1]
+
+    df_produtos_ativos = df_produtos[df_produtos['ativo']] if 'ativo' in df_produtos.columns else df_produtos
+    indicadores = {
+        'produtos_ativos': len(df_produtos_ativos),
+        'codigos_ativos': frozenset(df_produtos_ativos['codigo']),
+        'valor_estoque_custo': 0,
+        'estoque_critico': 0, 'estoque_baixo': 0, 'estoque_aceitavel': 0, 'estoque_otimo': 0,
+    }
+
+    if 'quantidadeEstoque' in df_produtos.columns:
+        # Calcula o valor total do estoque com base no custo.
+        if 'valorCustoMedio' in df_produtos.columns or 'valorCusto' in df_produtos.columns:
+            custo_col = 'valorCustoMedio' if 'valorCustoMedio' in df_produtos.columns else 'valorCusto'
+            indicadores['valor_estoque_custo'] = (df_produtos['quantidadeEstoque'] * df_produtos[custo_col]).sum()
+
+        # Classifica os produtos por níveis de estoque em uma única passada:
+        # até 2 (crítico), até 5 (baixo), até 10 (aceitável) e acima de 10 (ótimo).
+        estoque = df_produtos['quantidadeEstoque'].to_numpy(dtype=float)
+        niveis = np.bincount(np.digitize(estoque[~np.isnan(estoque)], [2, 5, 10], right=True), minlength=4)
+        indicadores['estoque_critico'], indicadores['estoque_baixo'], indicadores['estoque_aceitavel'], indicadores['estoque_otimo'] = niveis.tolist()
+
+    _indicadores_estoque_cache = (df_produtos, indicadores)
+    return indicadores
+
+# ==============================================================================
+# CACHE DAS RESPOSTAS DA API
+# ==============================================================================
+def _comprimir(corpo):
+    """
+    Comprime o corpo da resposta com gzip. Retorna None se o corpo for pequeno demais
+    para a compressão compensar.
+    """
+    if len(corpo) < COMPRESSAO_TAMANHO_MINIMO:
+        return None
+    return gzip.compress(corpo, compresslevel=COMPRESSAO_NIVEL)
+
+
+def _resposta_do_cache(corpo, corpo_gzip):
+    """
+    Monta a resposta JSON a partir de um item do cache, enviando a versão comprimida
+    quando ela existir e o navegador aceitar gzip.
+    """
+    resposta = app.response_class(corpo, mimetype='application/json')
+    resposta.vary.add('Accept-Encoding')
+    if corpo_gzip is not None and 'gzip' in request.accept_encodings:
+        resposta.set_data(corpo_gzip)
+        resposta.headers['Content-Encoding'] = 'gzip'
+    return resposta
+
+
+def _versao_atual(fonte):
+    """Versão dos dados que a fonte ('vendas', 'compras' ou 'banco') entregaria agora."""
+    if fonte == 'vendas':
+        return _cache_versao
+    if fonte == 'compras':
+        return _compras_cache_versao
+    return versao_banco()
+
+
+def cache_resposta(func):
+    """
+    Decorador para as rotas da API: guarda o corpo JSON já serializado (e comprimido com
+    gzip) de cada resposta, indexado pela rota e pelos parâmetros da URL (ex: dataInicio/dataFim).
+    Cada resposta fica guardada com as versões dos dados de que foi montada (ver
+    _registrar_dados_usados) e só é reaproveitada enquanto os caches de DataFrames
+    continuarem nessas mesmas versões, nunca além da validade deles (CACHE_DURATION_MINUTES).
+    Assim a compressão é feita uma única vez por resposta, e não a cada requisição.
+    """
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        chave = (request.path, tuple(sorted(request.args.items())))
+        agora = datetime.now()
+
+        item = _respostas_cache.get(chave)
+        if item is not None and item[0] > agora and all(_versao_atual(fonte) == versao for fonte, versao in item[1].items()):
+            return _resposta_do_cache(item[2], item[3])
+
+        resposta = func(*args, **kwargs)
+        if resposta.status_code != 200:
+            return resposta
+
+        # Remove as entradas vencidas para o dicionário não crescer indefinidamente.
+        for chave_antiga, (expira_em, _, _, _) in list(_respostas_cache.items()):
+            if expira_em <= agora:
+                _respostas_cache.pop(chave_antiga, None)
+        corpo = resposta.get_data()
+        dados_usados = g.get('dados_usados', {})
+        if any(versao is None for versao, _ in dados_usados.values()):
+            # Algum cache falhou ao carregar: a resposta vazia não é guardada.
+            return resposta
+        # A resposta vence junto com o mais antigo dos caches de DataFrames que a montaram.
+        expira_em = min([agora] + [carregado_em for _, carregado_em in dados_usados.values() if carregado_em is not None]) \
+            + timedelta(minutes=CACHE_DURATION_MINUTES)
+        versoes = {fonte: versao for fonte, (versao, _) in dados_usados.items()}
+        item = (expira_em, versoes, corpo, _comprimir(corpo))
+        _respostas_cache[chave] = item
+        return _resposta_do_cache(item[2], item[3])
+    return wrapper
+
+def _resposta_json(dados=None, **campos):
+    """
+    Serializa os dados (um dicionário ou argumentos nomeados, como no 'jsonify') com o
+    provedor orjson da aplicação e devolve a resposta JSON pronta.
+    """
+    return app.json.response(dados if dados is not None else campos)
+
+
+def _para_colunas(df):
+    """
+    Converte o DataFrame para o formato colunar ({coluna: [valores]}) enviado às páginas.
+    Cada nome de coluna aparece uma única vez, em vez de se repetir em todos os registros.
+    Colunas numéricas seguem como arrays do numpy, que o orjson codifica direto da memória,
+    sem criar um objeto Python por valor; as demais viram listas.
+    """
+    colunas = {}
+    for col in df.columns:
+        serie = df[col]
+        if serie.dtype.kind in 'biuf':
+            colunas[col] = np.ascontiguousarray(serie.to_numpy())
+        else:
+            colunas[col] = serie.tolist()
+    return colunas
+
+# ==============================================================================
+# AGREGADOS MATERIALIZADOS NO BANCO (PÁGINA DE DESEMPENHO)
+# ==============================================================================
+# Tabelas pequenas com as vendas 'OK' já somadas por dia. O ETL as recria logo após
+# gravar 'vendas_processadas' (ver agregados_painel.atualizar_agregados); o painel só as
+# cria na inicialização, se faltarem (banco novo ou consultas alteradas). A página de Desempenho
+# consulta estas tabelas (algumas linhas por dia do período) em vez de agrupar todas as vendas.
+
+def garantir_agregados():
+    """
+    Cria as tabelas de agregados que faltarem (ou com esquema antigo). Chamada uma vez, na
+    inicialização do servidor: depois disso, quem as recria é o ETL, a cada gravação das vendas.
+    """
+    try:
+        atualizar_agregados(engine)
+    except Exception as e:
+        logging.warning(f"Não foi possível criar os agregados de vendas: {e}")
+
+
+def _ler_agregado(sql, data_inicio, data_fim):
+    """
+    Executa uma consulta sobre as tabelas de agregados. O marcador '{periodo}' da consulta
+    recebe o filtro por dia quando as duas datas forem informadas.
+    """
+    params = ()
+    periodo = ''
+    if data_inicio and data_fim:
+        periodo = 'AND dia BETWEEN ? AND ?'
+        params = (data_inicio, data_fim)
+    try:
+        with engine.connect() as conn:
+            return pd.read_sql_query(sql.format(periodo=periodo), conn, params=params)
+    except OperationalError as e:
+        # Agregados ainda não criados (ver garantir_agregados): a página mostra o período vazio.
+        if 'no such table' not in str(e):
+            raise
+        logging.warning(f"Aviso ao ler os agregados de vendas: {e}. A tabela pode não existir.")
+        return pd.DataFrame()
 
 # ==============================================================================
 # ROTAS PARA RENDERIZAÇÃO DAS PÁGINAS HTML
@@ -178,6 +648,7 @@ def desempenho_page():
 # e tabelas nas páginas HTML, permitindo que o conteúdo seja dinâmico.
 
 @app.route('/api/dados-dashboard')
+@cache_resposta
 def api_dashboard_data():
     """
     API para a página 'Análise de Vendas'.
@@ -186,62 +657,62 @@ def api_dashboard_data():
     Aceita os parâmetros 'dataInicio' and 'dataFim' via URL.
     """
     # Carrega os dados, utilizando o cache se possível.
-    df_final, df_vendedores = carregar_e_processar_dados()
+    df_final, df_ok, df_vendedores = carregar_e_processar_dados()
 
     # Se não houver dados, retorna uma estrutura JSON vazia.
     if df_final.empty:
-        return jsonify(sales_data=[], all_sellers=[], vendas_por_pagamento={}, vendas_por_hora={}, vendas_por_vendedor={}, vendas_por_entrega={}, vendas_por_categoria={}, top_10_produtos_devolvidos_qtd={})
+        return _resposta_json(sales_data={}, all_sellers=[], vendas_por_pagamento={}, vendas_por_hora={}, vendas_por_vendedor={}, vendas_por_entrega={}, vendas_por_categoria={}, top_10_produtos_devolvidos_qtd={})
 
     # Pega as datas de início e fim dos parâmetros da URL (ex: ?dataInicio=2025-01-01).
     data_inicio = request.args.get('dataInicio')
     data_fim = request.args.get('dataFim')
     
-    # Filtra o DataFrame de vendas pelo período de datas, se fornecido.
-    if data_inicio and data_fim:
-        df_final = df_final[
-            (df_final['dataEmissao'] >= data_inicio) & (df_final['dataEmissao'] <= data_fim)
-        ]
+    # Filtra os DataFrames de vendas pelo período de datas, se fornecido.
+    df_final = _filtrar_periodo(df_final, data_inicio, data_fim)
+    df_ok = _filtrar_periodo(df_ok, data_inicio, data_fim)
 
     # Dicionários para armazenar os dados agregados para os gráficos.
     vendas_por_pagamento, vendas_por_hora, vendas_por_vendedor, vendas_por_entrega, vendas_por_categoria, top_10_produtos_devolvidos_qtd = {}, {}, {}, {}, {}, {}
 
     # Realiza as agregações apenas se houver dados no DataFrame.
     if not df_final.empty:
-        # Filtra apenas as vendas com status 'OK' para os cálculos de vendas.
-        df_ok = df_final[df_final['status_venda'] == 'OK'].copy()
-
         # Filtra apenas as devoluções para o gráfico de produtos devolvidos.
-        df_devolucoes = df_final[df_final['status_venda'] == 'DEVOLUÇÃO'].copy()
+        df_devolucoes = df_final[df_final['status_venda'] == 'DEVOLUÇÃO']
         
         if not df_ok.empty:
+            # Cada gráfico soma a receita pelos códigos da coluna 'category' (a hora é somada à parte),
+            # uma passada vetorizada por dimensão, sem montar agrupamentos.
             # Agregações para os gráficos existentes.
-            vendas_por_pagamento = df_ok.groupby('condicaoPagamento_nome')['valorTotalLiquido'].sum().sort_values(ascending=False).to_dict()
-            vendas_por_vendedor = df_ok.groupby('nomeVendedor')['valorTotalLiquido'].sum().sort_values(ascending=False).to_dict()
-            vendas_por_entrega = df_ok.groupby('entrega')['valorTotalLiquido'].sum().sort_values(ascending=False).to_dict()
+            vendas_por_pagamento = _somar_por_categoria(df_ok, 'condicaoPagamento_nome').sort_values(ascending=False).to_dict()
+            vendas_por_vendedor = _somar_por_categoria(df_ok, 'nomeVendedor').sort_values(ascending=False).to_dict()
+            vendas_por_entrega = _somar_por_categoria(df_ok, 'entrega').sort_values(ascending=False).to_dict()
 
             # Agregação para o NOVO GRÁFICO: Vendas por Categoria de Produto
             if 'nomeCategoria' in df_ok.columns:
-                vendas_por_categoria = df_ok.groupby('nomeCategoria')['valorTotalLiquido'].sum().sort_values(ascending=False).to_dict()
-
-            if 'horaEmissao' in df_ok.columns:
-                df_ok['hora'] = df_ok['horaEmissao'].str[:2]
-                vendas_hora_agg = df_ok.groupby('hora')['valorTotalLiquido'].sum()
-                horas_completas = [str(h).zfill(2) for h in range(24)]
-                vendas_hora_agg = vendas_hora_agg.reindex(horas_completas, fill_value=0).sort_index()
-                vendas_por_hora = vendas_hora_agg.to_dict()
+                vendas_por_categoria = _somar_por_categoria(df_ok, 'nomeCategoria').sort_values(ascending=False).to_dict()
+
+            if 'hora' in df_ok.columns:
+                # Soma a receita direto em um vetor fixo de 24 posições (uma por hora), sem agrupar nem reindexar.
+                horas = df_ok['hora'].to_numpy()
+                horas_validas = (horas >= 0) & (horas < 24)
+                vendas_hora_agg = np.bincount(horas[horas_validas], weights=df_ok['valorTotalLiquido'].to_numpy()[horas_validas], minlength=24)
+                vendas_por_hora = {f'{hora:02d}': float(valor) for hora, valor in enumerate(vendas_hora_agg)}
         
         if not df_devolucoes.empty:
             # Agregação para o NOVO GRÁFICO: Top 10 Produtos Devolvidos
             # Usa o valor absoluto da quantidade, pois ela foi negativada anteriormente.
-            top_10_produtos_devolvidos_qtd = df_devolucoes.groupby('nome')['quantidadeProdutos'].sum().abs().nlargest(10).sort_values(ascending=True).to_dict()
+            top_10_produtos_devolvidos_qtd = df_devolucoes.groupby('nome', observed=True)['quantidadeProdutos'].sum().abs().nlargest(10).sort_values(ascending=True).to_dict()
 
 
-    # Converte os DataFrames para JSON no formato de registros (lista de dicionários).
-    sales_data = json.loads(df_final.to_json(orient='records', date_format='iso'))
-    all_sellers = json.loads(df_vendedores.to_json(orient='records', date_format='iso'))
+    # Converte as vendas para o formato colunar (uma lista de valores por coluna), bem menor que
+    # uma lista de registros; os vendedores seguem como registros (dicionários).
+    # A data vai no formato 'AAAA-MM-DD' já preparado no carregamento; as colunas auxiliares não são enviadas.
+    df_saida = df_final.drop(columns=['hora', 'dataEmissao'], errors='ignore').rename(columns={'diaEmissao': 'dataEmissao'})
+    sales_data = _para_colunas(df_saida)
+    all_sellers = df_vendedores.to_dict(orient='records')
 
     # Retorna todos os dados compilados em um único objeto JSON, incluindo os novos.
-    return jsonify(
+    return _resposta_json(
         sales_data=sales_data, 
         all_sellers=all_sellers,
         vendas_por_pagamento=vendas_por_pagamento,
@@ -253,51 +724,55 @@ def api_dashboard_data():
     )
 
 @app.route('/api/dados-graficos')
+@cache_resposta
 def api_graficos_data():
     """
     API para gráficos específicos de produtos (Top 10 por quantidade e receita).
     Obs: Esta API parece não estar sendo utilizada por nenhuma página HTML fornecida.
     """
-    df_final, _ = carregar_e_processar_dados()
+    df_final, df_ok, _ = carregar_e_processar_dados()
 
     if df_final.empty:
-        return jsonify({})
+        return _resposta_json({})
 
-    # Filtra os dados por data, se os parâmetros forem fornecidos.
+    # Filtra as vendas 'OK' por data, se os parâmetros forem fornecidos.
     data_inicio = request.args.get('dataInicio')
     data_fim = request.args.get('dataFim')
-    df_filtrado = df_final.copy()
-    if data_inicio and data_fim:
-        df_filtrado = df_filtrado[(df_filtrado['dataEmissao'] >= data_inicio) & (df_filtrado['dataEmissao'] <= data_fim)]
+    df_ok = _filtrar_periodo(df_ok, data_inicio, data_fim)
     
     # Calcula o Top 10 de produtos por quantidade e por receita.
-    df_ok = df_filtrado[df_filtrado['status_venda'] == 'OK'].copy()
-    top_10_produtos_qtd = df_ok.groupby('nome')['quantidadeProdutos'].sum().nlargest(10)
-    top_10_produtos_receita = df_ok.groupby('nome')['valorTotalLiquido'].sum().nlargest(10)
+    # Um único agrupamento por produto atende aos dois rankings.
+    por_produto = df_ok.groupby('nome', observed=True)[['quantidadeProdutos', 'valorTotalLiquido']].sum()
+    top_10_produtos_qtd = por_produto['quantidadeProdutos'].nlargest(10)
+    top_10_produtos_receita = por_produto['valorTotalLiquido'].nlargest(10)
     
     dados_graficos = {
         'top_10_produtos_qtd': top_10_produtos_qtd.to_dict(),
         'top_10_produtos_receita': top_10_produtos_receita.to_dict(),
     }
     
-    return jsonify(dados_graficos)
+    return _resposta_json(dados_graficos)
 
 @app.route('/api/dados-desempenho')
+@cache_resposta
 def api_desempenho_data():
     """
     API principal para a página de 'Desempenho' (antigo Dashboard Geral).
     Calcula e retorna todos os KPIs e dados agregados para os gráficos da página,
     incluindo a comparação com o período anterior.
     """
-    df_final, _ = carregar_e_processar_dados()
-    if df_final.empty: return jsonify({})
+    # Os dados desta página vêm do banco (filtrados por período via SQL), então basta saber
+    # se há vendas, sem carregar a tabela inteira para a memória. A versão é lida antes das
+    # consultas, para a resposta guardada nunca ser mais nova que os dados lidos.
+    _registrar_dados_usados('banco', versao_banco(), None)
+    if not _existem_vendas(): return _resposta_json({})
 
-    # Obtém e filtra por data.
+    # Obtém o período selecionado.
     data_inicio_str = request.args.get('dataInicio')
     data_fim_str = request.args.get('dataFim')
-    df_filtrado = df_final.copy()
-    if data_inicio_str and data_fim_str:
-        df_filtrado = df_filtrado[(df_filtrado['dataEmissao'] >= data_inicio_str) & (df_filtrado['dataEmissao'] <= data_fim_str)]
+
+    # Os KPIs e gráficos vêm das tabelas de agregados (vendas 'OK' já somadas por dia), mantidas
+    # em dia pelo ETL: a requisição só as lê.
 
     # CÁLCULO DO PERÍODO ANTERIOR PARA COMPARAÇÃO
     receita_periodo_anterior = 0
@@ -311,26 +786,30 @@ def api_desempenho_data():
             # Define as datas de início e fim do período anterior.
             data_fim_anterior = data_inicio - timedelta(days=1)
             data_inicio_anterior = data_fim_anterior - timedelta(days=dias_periodo - 1)
-            # Converte de volta para string para filtrar o DataFrame.
+            # Converte de volta para string para filtrar no banco.
             data_inicio_anterior_str = data_inicio_anterior.strftime('%Y-%m-%d')
             data_fim_anterior_str = data_fim_anterior.strftime('%Y-%m-%d')
-            # Filtra o DataFrame original para o período anterior e calcula a receita.
-            df_anterior = df_final[(df_final['dataEmissao'] >= data_inicio_anterior_str) & (df_final['dataEmissao'] <= data_fim_anterior_str) & (df_final['status_venda'] == 'OK')]
-            receita_periodo_anterior = df_anterior['valorTotalLiquido'].sum()
+            # Soma a receita do período anterior direto no banco: uma consulta pelo índice
+            # de dia que devolve um único valor, sem percorrer o DataFrame de vendas.
+            with engine.connect() as conn:
+                receita_periodo_anterior = conn.exec_driver_sql(
+                    "SELECT COALESCE(SUM(receita), 0) FROM agg_vendas_dia_hora WHERE dia BETWEEN ? AND ?",
+                    (data_inicio_anterior_str, data_fim_anterior_str)
+                ).scalar()
         except Exception:
             receita_periodo_anterior = 0 # Em caso de erro, o valor é 0.
 
-    # Filtra vendas OK para o período atual.
-    df_ok = df_filtrado[df_filtrado['status_venda'] == 'OK'].copy()
+    # Vendas do período atual, por dia e hora.
+    vendas_dia_hora = _ler_agregado("SELECT dia, hora, dia_semana, receita, itens FROM agg_vendas_dia_hora WHERE 1 = 1 {periodo}", data_inicio_str, data_fim_str)
     # Se não houver vendas no período, retorna uma estrutura com valores zerados.
-    if df_ok.empty:
+    if vendas_dia_hora.empty:
         percentual_comparativo = -100 if receita_periodo_anterior > 0 else 0
-        return jsonify({'kpis': {'ticket_medio': 0, 'ipt': 0},'evolucao_receita': {'labels': [],'data': []},'top_categorias': {'labels': [], 'data': []},'comparativo': {'atual': 0,'anterior': receita_periodo_anterior,'percentual': percentual_comparativo},'mapa_calor': {},'top_vendedores': {'labels': [], 'data': []}})
+        return _resposta_json({'kpis': {'ticket_medio': 0, 'ipt': 0},'evolucao_receita': {'labels': [],'data': []},'top_categorias': {'labels': [], 'data': []},'comparativo': {'atual': 0,'anterior': receita_periodo_anterior,'percentual': percentual_comparativo},'mapa_calor': {},'top_vendedores': {'labels': [], 'data': []}})
 
     # CÁLCULO DOS KPIs (Key Performance Indicators)
-    receita_liquida_total = df_ok['valorTotalLiquido'].sum()
-    numero_vendas = df_ok['numeroNota'].nunique() # Conta notas únicas para ter o número de transações.
-    total_itens = df_ok['quantidadeProdutos'].sum()
+    receita_liquida_total = vendas_dia_hora['receita'].sum()
+    numero_vendas = int(_ler_agregado("SELECT COALESCE(SUM(notas), 0) AS notas FROM agg_vendas_dia_notas WHERE 1 = 1 {periodo}", data_inicio_str, data_fim_str)['notas'].iloc[0]) # Conta notas únicas para ter o número de transações.
+    total_itens = vendas_dia_hora['itens'].sum()
     ticket_medio = receita_liquida_total / numero_vendas if numero_vendas > 0 else 0
     itens_por_transacao = total_itens / numero_vendas if numero_vendas > 0 else 0
 
@@ -338,37 +817,27 @@ def api_desempenho_data():
     percentual_comparativo = ((receita_liquida_total - receita_periodo_anterior) / receita_periodo_anterior) * 100 if receita_periodo_anterior > 0 else (100 if receita_liquida_total > 0 else 0)
 
     # PREPARAÇÃO DOS DADOS PARA OS GRÁFICOS
-    df_ok['dataEmissao_dt'] = pd.to_datetime(df_ok['dataEmissao'])
     # Gráfico de evolução da receita: agrupa por dia.
-    receita_por_dia = df_ok.groupby(df_ok['dataEmissao_dt'].dt.strftime('%Y-%m-%d'))['valorTotalLiquido'].sum().sort_index()
+    receita_por_dia = _somar_por(vendas_dia_hora, 'dia', 'receita').sort_index()
     # Gráfico de Top 5 Categorias (Grupos de Produtos).
-    top_5_categorias = df_ok.groupby('nomeGrupo')['valorTotalLiquido'].sum().nlargest(5).sort_values(ascending=True)
+    receita_por_grupo = _ler_agregado("SELECT nomeGrupo, SUM(receita) AS receita FROM agg_vendas_dia_grupo WHERE 1 = 1 {periodo} GROUP BY nomeGrupo", data_inicio_str, data_fim_str)
+    top_5_categorias = receita_por_grupo.set_index('nomeGrupo')['receita'].sort_index().nlargest(5).sort_values(ascending=True)
     # Gráfico de Top 5 Vendedores.
-    top_5_vendedores = df_ok.groupby('nomeVendedor')['valorTotalLiquido'].sum().nlargest(5).sort_values(ascending=True)
+    receita_por_vendedor = _ler_agregado("SELECT nomeVendedor, SUM(receita) AS receita FROM agg_vendas_dia_vendedor WHERE 1 = 1 {periodo} GROUP BY nomeVendedor", data_inicio_str, data_fim_str)
+    top_5_vendedores = receita_por_vendedor.set_index('nomeVendedor')['receita'].sort_index().nlargest(5).sort_values(ascending=True)
 
     # PREPARAÇÃO DOS DADOS PARA O MAPA DE CALOR
-    dias_semana_map = {
-    0: 'Segunda-feira',
-    1: 'Terça-feira',
-    2: 'Quarta-feira',
-    3: 'Quinta-feira',
-    4: 'Sexta-feira',
-    5: 'Sábado',
-    6: 'Domingo'
-    }
-    df_ok['dia_semana'] = df_ok['dataEmissao_dt'].dt.dayofweek.map(dias_semana_map)
-    df_ok['hora'] = pd.to_numeric(df_ok['horaEmissao'].str[:2], errors='coerce').fillna(0).astype(int)
-    mapa_calor = df_ok.groupby(['dia_semana', 'hora'])['valorTotalLiquido'].sum().reset_index()
-    # Ordena os dias da semana corretamente.
+    # Soma a receita direto em uma matriz de 7 dias da semana x 24 horas (0 = segunda-feira),
+    # sem agrupar, pivotar nem completar colunas faltantes.
     dias_ordenados = ['Segunda-feira', 'Terça-feira', 'Quarta-feira', 'Quinta-feira', 'Sexta-feira', 'Sábado', 'Domingo']
-    mapa_calor['dia_semana'] = pd.Categorical(mapa_calor['dia_semana'], categories=dias_ordenados, ordered=True)
-    # Pivota a tabela para ter dias nas linhas e horas nas colunas.
-    mapa_calor_pivot = mapa_calor.pivot_table(index='dia_semana', columns='hora', values='valorTotalLiquido', fill_value=0, observed=False).reindex(dias_ordenados, fill_value=0)
-    # Garante que todas as 24 colunas de horas existam.
-    for hora in range(24):
-        if hora not in mapa_calor_pivot.columns:
-            mapa_calor_pivot[hora] = 0
-    mapa_calor_pivot = mapa_calor_pivot.reindex(sorted(mapa_calor_pivot.columns), axis=1)
+    vendas_com_dia = vendas_dia_hora.dropna(subset=['dia_semana'])
+    dias_semana = vendas_com_dia['dia_semana'].to_numpy(dtype='int64')
+    horas = vendas_com_dia['hora'].to_numpy()
+    horas_validas = (horas >= 0) & (horas < 24)
+    # Cada par (dia, hora) vira uma posição de 0 a 167; o bincount soma todas de uma vez
+    # (mais rápido que o np.add.at) e o resultado é redimensionado para a matriz 7 x 24.
+    posicoes = dias_semana[horas_validas] * 24 + horas[horas_validas]
+    mapa_calor = np.bincount(posicoes, weights=vendas_com_dia['receita'].to_numpy()[horas_validas], minlength=7 * 24).reshape(7, 24)
 
     # MONTAGEM DO JSON DE RESPOSTA
     dados_dashboard = {
@@ -376,105 +845,106 @@ def api_desempenho_data():
         'evolucao_receita': {'labels': receita_por_dia.index.tolist(),'data': receita_por_dia.values.tolist()},
         'top_categorias': {'labels': top_5_categorias.index.tolist(),'data': top_5_categorias.values.tolist()},
         'comparativo': {'atual': receita_liquida_total,'anterior': receita_periodo_anterior,'percentual': percentual_comparativo,'diferenca_valor': receita_liquida_total - receita_periodo_anterior},
-        'mapa_calor': mapa_calor_pivot.to_dict(orient='index'), # Converte o pivot para um dicionário.
+        'mapa_calor': {dia: dict(enumerate(mapa_calor[i].tolist())) for i, dia in enumerate(dias_ordenados)}, # Dia -> {hora: receita}.
         'top_vendedores': {'labels': top_5_vendedores.index.tolist(),'data': top_5_vendedores.values.tolist()}
     }
-    return jsonify(dados_dashboard)
+    return _resposta_json(dados_dashboard)
 
 @app.route('/api/dados-produtos-estoque')
+@cache_resposta
 def api_produtos_estoque_data():
     """
     API para a página de 'Produtos/Estoque'.
     Fornece indicadores de estoque, dados para a curva ABC, gráficos de top produtos
     e uma tabela detalhada de análise de produtos (vendas, custo, lucro, margem, giro).
     """
-    df_final, _ = carregar_e_processar_dados()
-    if df_final.empty: return jsonify({})
+    df_final, df_ok, _ = carregar_e_processar_dados()
+    if df_final.empty: return _resposta_json({})
 
-    # Carrega a tabela de produtos, que contém informações de estoque.
-    df_produtos = pd.DataFrame()
-    try:
-        df_produtos = pd.read_sql_table('produtos', f'sqlite:///{cfg.DATABASE_FILE}')
-        # Garante que o código do produto seja string para o merge funcionar corretamente.
-        df_produtos['codigo'] = df_produtos['codigo'].astype(str)
-    except Exception:
-        return jsonify({}) # Retorna vazio se a tabela de produtos não existir.
+    # Usa a tabela de produtos (com informações de estoque) carregada junto com as vendas,
+    # já em cache e com 'codigo' como texto e 'ativo' como booleano.
+    df_produtos = _df_produtos_cache
+    if df_produtos is None or df_produtos.empty:
+        return _resposta_json({}) # Retorna vazio se a tabela de produtos não existir.
 
     # Filtra as vendas pelo período selecionado.
     data_inicio = request.args.get('dataInicio')
     data_fim = request.args.get('dataFim')
-    df_vendas_periodo = df_final.copy()
-    if data_inicio and data_fim:
-        df_vendas_periodo = df_final[(df_final['dataEmissao'] >= data_inicio) & (df_final['dataEmissao'] <= data_fim)]
+    df_vendas_periodo = _filtrar_periodo(df_final, data_inicio, data_fim)
     
     # CÁLCULO DOS INDICADORES DE ESTOQUE (CARDS)
-    produtos_ativos = df_produtos[df_produtos['ativo'] == True].shape[0] if 'ativo' in df_produtos.columns else df_produtos.shape[0]
-
-    codigos_produtos_vendidos = df_vendas_periodo['codigoProduto'].unique()
-    df_produtos_ativos = df_produtos[df_produtos['ativo'] == True] if 'ativo' in df_produtos.columns else df_produtos
-    codigos_produtos_ativos = df_produtos_ativos['codigo'].unique()
-    produtos_sem_venda = len(set(codigos_produtos_ativos) - set(codigos_produtos_vendidos))
-    
-    # Calcula o valor total do estoque com base no custo.
-    valor_estoque_custo = 0
-    if 'quantidadeEstoque' in df_produtos.columns and ('valorCustoMedio' in df_produtos.columns or 'valorCusto' in df_produtos.columns):
-        custo_col = 'valorCustoMedio' if 'valorCustoMedio' in df_produtos.columns else 'valorCusto'
-        df_produtos['valor_total_estoque_custo'] = df_produtos['quantidadeEstoque'] * df_produtos[custo_col]
-        valor_estoque_custo = df_produtos['valor_total_estoque_custo'].sum()
-
-    # Classifica os produtos por níveis de estoque.
-    estoque_critico = estoque_baixo = estoque_aceitavel = estoque_otimo = 0
-    if 'quantidadeEstoque' in df_produtos.columns:
-        estoque_critico = df_produtos[df_produtos['quantidadeEstoque'] <= 2].shape[0]
-        estoque_baixo = df_produtos[(df_produtos['quantidadeEstoque'] > 2) & (df_produtos['quantidadeEstoque'] <= 5)].shape[0]
-        estoque_aceitavel = df_produtos[(df_produtos['quantidadeEstoque'] > 5) & (df_produtos['quantidadeEstoque'] <= 10)].shape[0]
-        estoque_otimo = df_produtos[df_produtos['quantidadeEstoque'] > 10].shape[0]
+    # Os indicadores que não dependem do período vêm prontos do cache de produtos;
+    # por requisição resta apenas contar os produtos ativos sem venda no período.
+    estoque = _indicadores_estoque(df_produtos)
+    # Os códigos vendidos saem das categorias em uso no período (contagem dos códigos inteiros),
+    # sem percorrer o texto de todas as linhas. Os ativos sem venda são os ativos menos os que
+    # aparecem entre os vendidos: a interseção percorre só os vendidos e não copia o conjunto de ativos.
+    codigos_vendidos = df_vendas_periodo['codigoProduto']
+    if isinstance(codigos_vendidos.dtype, pd.CategoricalDtype):
+        codigos_em_uso = codigos_vendidos.cat.codes.to_numpy()
+        codigos_em_uso = codigos_em_uso[codigos_em_uso >= 0]
+        codigos_vendidos = codigos_vendidos.cat.categories[np.bincount(codigos_em_uso, minlength=len(codigos_vendidos.cat.categories)) > 0]
+    else:
+        codigos_vendidos = codigos_vendidos.unique()
+    produtos_sem_venda = len(estoque['codigos_ativos']) - len(estoque['codigos_ativos'].intersection(codigos_vendidos))
 
-    indicadores = {'produtos_ativos': produtos_ativos, 'produtos_sem_venda': produtos_sem_venda, 'valor_estoque_custo': valor_estoque_custo, 'estoque_critico': estoque_critico, 'estoque_baixo': estoque_baixo, 'estoque_aceitavel': estoque_aceitavel, 'estoque_otimo': estoque_otimo}
+    indicadores = {'produtos_ativos': estoque['produtos_ativos'], 'produtos_sem_venda': produtos_sem_venda, 'valor_estoque_custo': estoque['valor_estoque_custo'], 'estoque_critico': estoque['estoque_critico'], 'estoque_baixo': estoque['estoque_baixo'], 'estoque_aceitavel': estoque['estoque_aceitavel'], 'estoque_otimo': estoque['estoque_otimo']}
     
-    # Filtra vendas com status OK para a análise de produtos.
-    df_ok = df_vendas_periodo[df_vendas_periodo['status_venda'] == 'OK'].copy()
+    # Vendas com status OK do período, para a análise de produtos.
+    df_ok = _filtrar_periodo(df_ok, data_inicio, data_fim)
     if df_ok.empty:
         # Se não houver vendas, retorna apenas os indicadores de estoque.
-        return jsonify(indicadores=indicadores, curva_abc={'labels': [], 'data': []}, graficos_top={'top_qtd': {'labels': [], 'data': []}, 'top_receita': {'labels': [], 'data': []}}, tabela_produtos=[])
+        return _resposta_json(indicadores=indicadores, curva_abc={'labels': [], 'data': []}, graficos_top={'top_qtd': {'labels': [], 'data': []}, 'top_receita': {'labels': [], 'data': []}}, tabela_produtos=[])
+
+    # Agrupa os dados de vendas por produto para calcular métricas. Este é o único agrupamento
+    # sobre as vendas: a curva ABC e os gráficos de top 10 são derivados dele.
+    analise_produtos = df_ok.groupby(['codigoProduto', 'nome'], observed=True).agg(qtd_vendida=('quantidadeProdutos', 'sum'), receita_gerada=('valorTotalLiquido', 'sum'), custo_total=('valorTotalCusto', 'sum')).reset_index()
+    por_nome = analise_produtos.groupby('nome', observed=True)[['qtd_vendida', 'receita_gerada']].sum()
 
     # CÁLCULO DA CURVA ABC
-    receita_por_produto = df_ok.groupby('nome')['valorTotalLiquido'].sum().sort_values(ascending=False)
+    receita_por_produto = por_nome['receita_gerada'].sort_values(ascending=False)
     receita_total = receita_por_produto.sum()
     percentual_acumulado = (receita_por_produto.cumsum() / receita_total) * 100
-    # Classifica os produtos em A (80%), B (15%) e C (5%) da receita.
-    classificacao_abc = percentual_acumulado.apply(lambda p: 'A' if p <= 80 else ('B' if p <= 95 else 'C')).value_counts()
-    curva_abc = {'labels': classificacao_abc.index.tolist(), 'data': classificacao_abc.values.tolist()}
+    # Classifica os produtos em A (80%), B (15%) e C (5%) da receita: a busca binária nos
+    # limites dá a classe de cada produto (0 = A, 1 = B, 2 = C) de uma só vez, sem lambda por linha.
+    classes_abc = np.searchsorted([80.0, 95.0], percentual_acumulado.to_numpy(), side='left')
+    contagem_abc = np.bincount(classes_abc, minlength=3)
+    # Mesma ordem do 'value_counts': da classe mais numerosa para a menos (empates na ordem A, B, C).
+    ordem_abc = [classe for classe in np.argsort(-contagem_abc, kind='stable') if contagem_abc[classe] > 0]
+    curva_abc = {'labels': [('A', 'B', 'C')[classe] for classe in ordem_abc], 'data': [int(contagem_abc[classe]) for classe in ordem_abc]}
 
     # CÁLCULO DOS GRÁFICOS DE TOP 10 PRODUTOS
-    top_10_produtos_qtd = df_ok.groupby('nome')['quantidadeProdutos'].sum().nlargest(10).sort_values(ascending=True)
-    top_10_produtos_receita = df_ok.groupby('nome')['valorTotalLiquido'].sum().nlargest(10).sort_values(ascending=True)
+    top_10_produtos_qtd = por_nome['qtd_vendida'].nlargest(10).sort_values(ascending=True)
+    top_10_produtos_receita = por_nome['receita_gerada'].nlargest(10).sort_values(ascending=True)
     graficos_top = {'top_qtd': {'labels': top_10_produtos_qtd.index.tolist(), 'data': top_10_produtos_qtd.values.tolist()}, 'top_receita': {'labels': top_10_produtos_receita.index.tolist(), 'data': top_10_produtos_receita.values.tolist()}}
 
     # MONTAGEM DA TABELA DE ANÁLISE DE PRODUTOS
-    # Agrupa os dados de vendas por produto para calcular métricas.
-    analise_produtos = df_ok.groupby(['codigoProduto', 'nome']).agg(qtd_vendida=('quantidadeProdutos', 'sum'), receita_gerada=('valorTotalLiquido', 'sum'), custo_total=('valorTotalCusto', 'sum')).reset_index()
-    analise_produtos['lucro_bruto'] = analise_produtos['receita_gerada'] - analise_produtos['custo_total']
-    analise_produtos['margem_percentual'] = (analise_produtos['lucro_bruto'] / analise_produtos['receita_gerada'].replace(0, 1)) * 100
+    # Lucro e margem calculados direto sobre os arrays das colunas (o divisor 0 vira 1),
+    # sem criar Series intermediárias para cada passo.
+    receita = analise_produtos['receita_gerada'].to_numpy()
+    lucro_bruto = receita - analise_produtos['custo_total'].to_numpy()
+    analise_produtos = analise_produtos.assign(lucro_bruto=lucro_bruto, margem_percentual=lucro_bruto / np.where(receita == 0, 1, receita) * 100)
     
     # Junta os dados de vendas com os dados de estoque da tabela de produtos.
     if 'quantidadeEstoque' in df_produtos.columns:
         tabela_final = pd.merge(analise_produtos, df_produtos[['codigo', 'quantidadeEstoque']], left_on='codigoProduto', right_on='codigo', how='left').fillna(0)
         # Calcula o giro de estoque simplificado.
-        tabela_final['giro_estoque'] = tabela_final['qtd_vendida'] / tabela_final['quantidadeEstoque'].replace(0, 1)
+        estoque_atual = tabela_final['quantidadeEstoque'].to_numpy()
+        tabela_final['giro_estoque'] = tabela_final['qtd_vendida'].to_numpy() / np.where(estoque_atual == 0, 1, estoque_atual)
     else:
         # Se não houver dados de estoque, preenche com 0.
         tabela_final = analise_produtos
         tabela_final['quantidadeEstoque'] = 0
         tabela_final['giro_estoque'] = 0
-    tabela_json = json.loads(tabela_final.to_json(orient='records'))
+    tabela_json = tabela_final.to_dict(orient='records')
 
     # Retorna todos os dados para a página.
-    return jsonify(indicadores=indicadores, curva_abc=curva_abc, graficos_top=graficos_top, tabela_produtos=tabela_json)
+    return _resposta_json(indicadores=indicadores, curva_abc=curva_abc, graficos_top=graficos_top, tabela_produtos=tabela_json)
 
 
 # --- Endpoint da API para a página de Financeiro/Compras ---
 @app.route('/api/dados-financeiro-compras')
+@cache_resposta
 def api_financeiro_compras_data():
     """
     API para a página 'Financeiro/Compras'.
@@ -485,7 +955,7 @@ def api_financeiro_compras_data():
     df_compras, df_fornecedores, df_produtos = carregar_dados_compras()
 
     if df_compras.empty:
-        return jsonify(compras_data=[]) # Retorna estrutura vazia se não houver compras
+        return _resposta_json(compras_data={}) # Retorna estrutura vazia se não houver compras
 
     # 2. FILTRAGEM POR DATA
     data_inicio = request.args.get('dataInicio')
@@ -496,46 +966,38 @@ def api_financeiro_compras_data():
         ]
 
     if df_compras.empty:
-        return jsonify(compras_data=[])
+        return _resposta_json(compras_data={})
 
     # 3. PROCESSAMENTO E ENRIQUECIMENTO DOS DADOS
     # Função auxiliar para converter a coluna 'itens' (que é uma string JSON) para uma lista de objetos
     def safe_json_loads(s):
-        if isinstance(s, str):
+        if isinstance(s, (str, bytes)):
             try:
-                return json.loads(s)
-            except (json.JSONDecodeError, TypeError):
+                return orjson.loads(s)
+            except orjson.JSONDecodeError:
                 return [] # Retorna lista vazia se a string for inválida
         return s if isinstance(s, list) else []
 
-    df_compras['itens'] = df_compras['itens'].apply(safe_json_loads)
-    
-    # "Explode" o DataFrame para que cada item de uma nota de compra vire uma linha
-    df_flat = df_compras.explode('itens').reset_index(drop=True)
-
-    # Normaliza a coluna 'itens' (que agora contém dicionários) em colunas separadas
-    df_itens_normalized = pd.json_normalize(df_flat['itens'])
-    
-    # Junta o DataFrame original (sem a coluna 'itens') com as novas colunas dos itens
-    df_flat = pd.concat([df_flat.drop(columns=['itens']), df_itens_normalized], axis=1)
-
-    # 4. JUNÇÃO (MERGE) COM FORNECEDORES E PRODUTOS PARA OBTER NOMES
-    # Padroniza os tipos das chaves para a junção
-    df_flat['codigoFornecedor'] = df_flat['codigoFornecedor'].astype(str)
-    df_flat['codigoProduto'] = df_flat['codigoProduto'].astype(str)
-    df_fornecedores['codigo'] = df_fornecedores['codigo'].astype(str)
-    df_produtos['codigo'] = df_produtos['codigo'].astype(str)
-
-    # Junta com fornecedores
-    df_merged = pd.merge(df_flat, df_fornecedores[['codigo', 'nomeFantasia']], left_on='codigoFornecedor', right_on='codigo', how='left')
-
-    df_merged.rename(columns={'nomeFantasia': 'nomeFornecedor'}, inplace=True)
-    df_merged['nomeFornecedor'].fillna('Fornecedor não encontrado', inplace=True)
-    
-    # Junta com produtos
-    df_final = pd.merge(df_merged, df_produtos[['codigo', 'nome']], left_on='codigoProduto', right_on='codigo', how='left')
-    df_final.rename(columns={'nome': 'descricaoProduto'}, inplace=True)
-    df_final['descricaoProduto'].fillna('Produto não encontrado', inplace=True)
+    # Monta um registro por item, já com os campos da nota de compra, em uma única passada
+    # pelas notas. O DataFrame é criado uma só vez no final.
+    colunas_nota = [col for col in df_compras.columns if col != 'itens']
+    registros = []
+    for campos_nota, itens in zip(df_compras[colunas_nota].to_dict(orient='records'), df_compras['itens']):
+        itens = [item for item in safe_json_loads(itens) if isinstance(item, dict)]
+        if not itens:
+            # Nota sem itens continua aparecendo (com os campos do item vazios).
+            registros.append(campos_nota)
+        for item in itens:
+            registros.append({**campos_nota, **item})
+    df_flat = pd.DataFrame.from_records(registros)
+
+    # 4. BUSCA DOS NOMES DE FORNECEDORES E PRODUTOS
+    # Padroniza o código do produto (vindo dos itens) como texto e busca os nomes em
+    # dicionários (código -> nome), sem precisar juntar (merge) DataFrames inteiros.
+    df_final = df_flat
+    df_final['codigoProduto'] = df_final['codigoProduto'].astype(str)
+    df_final['nomeFornecedor'] = df_final['codigoFornecedor'].map(_mapa_nomes(df_fornecedores, 'nomeFantasia')).fillna('Fornecedor não encontrado')
+    df_final['descricaoProduto'] = df_final['codigoProduto'].map(_mapa_nomes(df_produtos, 'nome')).fillna('Produto não encontrado')
     
     # 5. AJUSTE FINAL DAS COLUNAS PARA O FRONT-END
     # Renomeia e calcula colunas para corresponder ao que o JavaScript espera
@@ -554,9 +1016,9 @@ def api_financeiro_compras_data():
     ]
     df_final = df_final[[col for col in colunas_finais if col in df_final.columns]]
 
-    # 6. RETORNO DOS DADOS EM FORMATO JSON
-    compras_data = json.loads(df_final.to_json(orient='records', date_format='iso'))
-    return jsonify(compras_data=compras_data)
+    # 6. RETORNO DOS DADOS EM FORMATO JSON (colunar: uma lista de valores por coluna)
+    compras_data = _para_colunas(df_final)
+    return _resposta_json(compras_data=compras_data)
 
 
 # ==============================================================================
@@ -566,6 +1028,8 @@ def api_financeiro_compras_data():
 if __name__ == '__main__':
     # Cria o diretório de dados se ele não existir.
     os.makedirs(cfg.DATA_DIR, exist_ok=True)
+    # Cria as tabelas de agregados da página de Desempenho, se ainda não existirem.
+    garantir_agregados()
     # Inicia o servidor de desenvolvimento do Flask.
     # debug=True ativa o modo de depuração, que reinicia o servidor a cada alteração no código.
     app.run(host='0.0.0.0', port=5000, debug=True)
\ No newline at end of file
@@ -17,22 +17,35 @@
 # IMPORTAÇÃO DE BIBLIOTECAS
 # ==============================================================================
 import requests  # Para realizar chamadas HTTP para a API.
+from requests.adapters import HTTPAdapter  # Para dimensionar o pool de conexões reaproveitadas com a API.
 import pandas as pd  # Para manipulação e análise de dados em DataFrames.
 import time  # Para pausas estratégicas (ex: em novas tentativas de requisição).
 import os    # Para interagir com o sistema operacional (criar pastas, verificar arquivos).
 import json  # Para serializar/desserializar objetos Python para o formato JSON.
+import orjson  # Serialização JSON rápida das listas/dicionários gravados no banco.
+import numpy as np  # Para montar as colunas convertidas direto sobre os arrays.
 from datetime import datetime, timedelta  # Para trabalhar com datas e horas.
 import logging  # Para registrar eventos, avisos e erros da aplicação.
-import sqlite3  # Para conectar e interagir com o banco de dados SQLite.
+import itertools  # Contador das escritas em cada tabela (versão usada pelos caches de leitura).
+from concurrent.futures import ThreadPoolExecutor  # Para buscar várias páginas da API ao mesmo tempo.
+from pandas.api.types import infer_dtype  # Identifica (em C) o tipo do conteúdo de colunas 'object'.
+from sqlalchemy import create_engine, event, inspect  # Para manter um único pool de conexões com o banco SQLite.
+from sqlalchemy import MetaData, Table, select  # Para ler da tabela 'vendas' só as notas alteradas.
+from sqlalchemy.exc import IntegrityError, NoSuchTableError  # Erros de chave repetida (índices únicos) e de tabela inexistente.
 
 # Importa as configurações globais (URLs, tokens, caminhos de arquivo).
 import config_conexao as cfg
+# Recriação dos agregados do painel (compartilhada com o app).
+from agregados_painel import atualizar_agregados
 
 
 # ==============================================================================
 # FUNÇÕES AUXILIARES DE BANCO DE DADOS E MANIPULAÇÃO DE DADOS
 # ==============================================================================
 
+# Tipos (segundo 'infer_dtype') de colunas que não podem conter listas nem dicionários.
+_TIPOS_SEM_OBJETOS = {'empty', 'string', 'bytes', 'integer', 'floating', 'mixed-integer-float', 'boolean', 'decimal'}
+
 def _converter_objetos_para_json(df: pd.DataFrame) -> pd.DataFrame:
     """
     Converte colunas de um DataFrame que contêm objetos Python (listas/dicionários)
@@ -43,16 +56,34 @@ def _converter_objetos_para_json(df: pd.DataFrame) -> pd.DataFrame:
         df (pd.DataFrame): O DataFrame a ser processado.
 
     Returns:
-        pd.DataFrame: Uma cópia do DataFrame com as colunas de objeto convertidas para JSON.
+        pd.DataFrame: O DataFrame com as colunas de objeto convertidas para JSON. Sem
+                      colunas a converter, é o próprio DataFrame recebido (sem cópia).
     """
-    df_copia = df.copy()
+    convertidas = {}
     # Itera sobre todas as colunas do tipo 'object' (que podem ser strings, listas, dicts, etc.).
-    for col in df_copia.select_dtypes(include=['object']).columns:
-        # Aplica a conversão para JSON apenas se o valor for um dicionário ou lista.
-        df_copia[col] = df_copia[col].apply(
-            lambda x: json.dumps(x, ensure_ascii=False) if isinstance(x, (dict, list)) else x
-        )
-    return df_copia
+    for col in df.select_dtypes(include=['object']).columns:
+        valores = df[col].to_numpy()
+        # Colunas só de texto ou números (caso da 'vendas_processadas', já achatada) são
+        # reconhecidas pelo pandas em C, sem percorrer as células em Python.
+        if infer_dtype(valores, skipna=True) in _TIPOS_SEM_OBJETOS:
+            continue
+        # Uma única passada marca as células que são dicionário ou lista; colunas sem
+        # nenhuma delas (a maioria) ficam como estão.
+        complexos = np.fromiter((isinstance(x, (dict, list)) for x in valores), dtype=bool, count=len(valores))
+        if not complexos.any():
+            continue
+        # Converte para JSON (com orjson) apenas as células marcadas, em um array novo.
+        valores = valores.copy()
+        valores[complexos] = [orjson.dumps(x, option=orjson.OPT_NON_STR_KEYS).decode('utf-8') for x in valores[complexos]]
+        convertidas[col] = valores
+    if not convertidas:
+        return df
+    # Cópia rasa: as colunas não convertidas continuam compartilhando os dados do original,
+    # que não é alterado (as convertidas apenas substituem a referência na cópia).
+    df_convertido = df.copy(deep=False)
+    for col, valores in convertidas.items():
+        df_convertido[col] = valores
+    return df_convertido
 
 def _get_db_connection_string() -> str:
     """
@@ -64,6 +95,64 @@ def _get_db_connection_string() -> str:
     """
     return f'sqlite:///{cfg.DATABASE_FILE}'
 
+# Engine criada uma única vez e reaproveitada por todas as leituras e gravações do ETL.
+# Passar a string de conexão ao pandas cria uma engine (e abre o arquivo) a cada chamada.
+# 'timeout': tarefas que gravam ao mesmo tempo (ex: cargas iniciais em paralelo) esperam a vez de
+# escrever em vez de falhar com 'database is locked'.
+engine = create_engine(_get_db_connection_string(), connect_args={'check_same_thread': False, 'timeout': 60})
+
+
+@event.listens_for(engine, 'connect')
+def _configurar_conexao(conexao_dbapi, _registro):
+    """
+    Ajusta cada nova conexão SQLite do pool (roda uma única vez por conexão).
+    """
+    cursor = conexao_dbapi.cursor()
+    try:
+        # WAL: as gravações do ETL não bloqueiam as leituras do painel (e vice-versa).
+        cursor.execute('PRAGMA journal_mode=WAL')
+    except Exception as e:
+        logging.warning(f"Não foi possível ativar o modo WAL no banco: {e}")
+    cursor.execute('PRAGMA synchronous=NORMAL')   # Com WAL, continua seguro e evita um fsync por transação.
+    cursor.execute('PRAGMA cache_size=-65536')    # Cache de páginas de 64 MB por conexão.
+    cursor.execute('PRAGMA temp_store=MEMORY')    # Tabelas temporárias em memória.
+    cursor.close()
+
+# Número de linhas enviadas por vez ao banco. O pandas fatia o DataFrame nesses blocos,
+# então só um bloco de linhas convertidas para Python fica em memória a cada momento.
+ESCRITA_CHUNKSIZE = 50_000
+
+def _inserir_em_lote(tabela_pandas, conn, colunas: list, linhas):
+    """
+    Método de inserção usado pelo 'to_sql': envia as linhas de cada bloco (ver
+    ESCRITA_CHUNKSIZE) em um único 'executemany' do driver sqlite3 ('INSERT OR REPLACE'),
+    dentro da transação aberta pelo pandas, sem montar uma instrução do SQLAlchemy por lote.
+
+    Args:
+        tabela_pandas: Objeto de tabela do pandas (nome e esquema de destino).
+        conn: Conexão SQLAlchemy aberta pelo 'to_sql'.
+        colunas (list): Nomes das colunas, na ordem dos valores de cada linha.
+        linhas: Iterável com as linhas (já convertidas pelo pandas: NaN vira None etc.).
+    """
+    colunas_sql = ', '.join(f'"{col}"' for col in colunas)
+    marcadores = ', '.join('?' for _ in colunas)
+    sql = f'INSERT OR REPLACE INTO "{tabela_pandas.name}" ({colunas_sql}) VALUES ({marcadores})'
+    linhas = list(linhas)
+    conn.exec_driver_sql(sql, linhas)
+    return len(linhas)
+
+# Versão de cada tabela gravada por este processo: um número novo a cada escrita. Permite
+# reaproveitar leituras de tabelas que não mudaram desde então (ex: os cadastros no reprocessamento).
+_contador_escritas = itertools.count(1)
+_versao_tabelas = {}
+
+def _marcar_tabela_alterada(nome_tabela: str):
+    """
+    Registra que a tabela foi (re)escrita, invalidando as leituras guardadas dela.
+    Chamada depois da gravação, para que uma leitura feita no meio dela não fique valendo.
+    """
+    _versao_tabelas[nome_tabela] = next(_contador_escritas)
+
 def _escrever_para_db(df: pd.DataFrame, nome_tabela: str, if_exists: str = 'replace'):
     """
     Escreve um DataFrame em uma tabela do banco de dados SQLite.
@@ -81,24 +170,88 @@ def _escrever_para_db(df: pd.DataFrame, nome_tabela: str, if_exists: str = 'repl
         # Se a estratégia for 'replace', remove a tabela antiga para não deixar dados obsoletos.
         if if_exists == 'replace':
             try:
-                conn = sqlite3.connect(cfg.DATABASE_FILE)
-                conn.execute(f"DROP TABLE IF EXISTS {nome_tabela}")
-                conn.close()
+                with engine.begin() as conn:
+                    conn.exec_driver_sql(f"DROP TABLE IF EXISTS {nome_tabela}")
                 logging.info(f"Tabela '{nome_tabela}' existente foi removida pois o novo DataFrame está vazio.")
             except Exception as e:
                 logging.error(f"Não foi possível remover a tabela antiga '{nome_tabela}': {e}")
+            finally:
+                _marcar_tabela_alterada(nome_tabela)
         return
         
     try:
         # Prepara o DataFrame para o banco, convertendo objetos em JSON.
         df_pronto_para_db = _converter_objetos_para_json(df)
-        conn_str = _get_db_connection_string()
-        # Usa a função to_sql do pandas para escrever os dados no banco.
-        df_pronto_para_db.to_sql(nome_tabela, conn_str, if_exists=if_exists, index=False)
+        # Usa a função to_sql do pandas para criar a tabela (pela engine compartilhada); as linhas
+        # são gravadas em lote por '_inserir_em_lote', em uma única transação.
+        df_pronto_para_db.to_sql(nome_tabela, engine, if_exists=if_exists, index=False, method=_inserir_em_lote, chunksize=ESCRITA_CHUNKSIZE)
         logging.info(f"Sucesso: {len(df)} registros foram escritos na tabela '{nome_tabela}' com a estratégia '{if_exists}'.")
     except Exception as e:
         logging.error(f"Falha ao escrever na tabela '{nome_tabela}' do banco de dados: {e}", exc_info=True)
         raise
+    finally:
+        _marcar_tabela_alterada(nome_tabela)
+
+def _garantir_chave_unica(conn, nome_tabela: str, chave: str):
+    """
+    Cria (se ainda não existir) o índice único da coluna-chave da tabela, usado pelo
+    'INSERT OR REPLACE' para substituir a versão antiga de cada registro. Se a tabela
+    tiver chaves repetidas (gravadas antes do índice existir), mantém a última versão.
+    """
+    sql_indice = f'CREATE UNIQUE INDEX IF NOT EXISTS "ux_{nome_tabela}_{chave}" ON "{nome_tabela}" ("{chave}")'
+    try:
+        conn.exec_driver_sql(sql_indice)
+    except IntegrityError:
+        logging.warning(f"Chaves repetidas em '{nome_tabela}.{chave}'. Mantendo apenas a última versão de cada uma.")
+        conn.exec_driver_sql(f'DELETE FROM "{nome_tabela}" WHERE rowid NOT IN (SELECT MAX(rowid) FROM "{nome_tabela}" GROUP BY "{chave}")')
+        conn.exec_driver_sql(sql_indice)
+
+def _upsert_para_db(df: pd.DataFrame, nome_tabela: str, chave: str, chaves_para_remover=None):
+    """
+    Grava apenas os registros novos/alterados em uma tabela, sem reescrevê-la inteira.
+    Cada registro substitui a versão existente com a mesma chave ('INSERT OR REPLACE'
+    sobre um índice único), como o antigo 'concat + drop_duplicates(keep='last')'. Chaves
+    repetidas dentro do próprio 'df' também ficam só com a última linha.
+
+    Args:
+        df (pd.DataFrame): Os registros novos ou alterados.
+        nome_tabela (str): O nome da tabela de destino no banco.
+        chave (str): A coluna que identifica cada registro (ex: 'numeroNota').
+        chaves_para_remover (iterable, optional): Chaves a apagar antes da gravação
+                                                  (ex: notas canceladas sem nova versão).
+    """
+    chaves_para_remover = [chave_remover.item() if hasattr(chave_remover, 'item') else chave_remover
+                           for chave_remover in (chaves_para_remover if chaves_para_remover is not None else [])]
+    try:
+        with engine.begin() as conn:
+            colunas_tabela = [linha[1] for linha in conn.exec_driver_sql(f'PRAGMA table_info("{nome_tabela}")')]
+            if not colunas_tabela:
+                # Tabela ainda não existe: é criada com o esquema do pandas e já com o índice único,
+                # para que as chaves repetidas no lote sejam resolvidas pelo próprio 'INSERT OR REPLACE'.
+                if df.empty: return
+                df_pronto_para_db = _converter_objetos_para_json(df)
+                conn.exec_driver_sql(pd.io.sql.get_schema(df_pronto_para_db, nome_tabela, con=conn))
+                _garantir_chave_unica(conn, nome_tabela, chave)
+                df_pronto_para_db.to_sql(nome_tabela, conn, if_exists='append', index=False, method=_inserir_em_lote, chunksize=ESCRITA_CHUNKSIZE)
+                logging.info(f"Sucesso: tabela '{nome_tabela}' criada com {len(df)} registros.")
+                return
+
+            _garantir_chave_unica(conn, nome_tabela, chave)
+            if chaves_para_remover:
+                conn.exec_driver_sql(f'DELETE FROM "{nome_tabela}" WHERE "{chave}" = ?', [(c,) for c in chaves_para_remover])
+            if df.empty: return
+
+            # Colunas que surgiram na API depois da criação da tabela são acrescentadas a ela.
+            for col in df.columns:
+                if col not in colunas_tabela:
+                    conn.exec_driver_sql(f'ALTER TABLE "{nome_tabela}" ADD COLUMN "{col}"')
+            _converter_objetos_para_json(df).to_sql(nome_tabela, conn, if_exists='append', index=False, method=_inserir_em_lote, chunksize=ESCRITA_CHUNKSIZE)
+        logging.info(f"Sucesso: {len(df)} registros novos/alterados gravados na tabela '{nome_tabela}'.")
+    except Exception as e:
+        logging.error(f"Falha ao gravar os registros na tabela '{nome_tabela}' do banco de dados: {e}", exc_info=True)
+        raise
+    finally:
+        _marcar_tabela_alterada(nome_tabela)
 
 def _ler_do_db(nome_tabela: str) -> pd.DataFrame:
     """
@@ -112,9 +265,8 @@ def _ler_do_db(nome_tabela: str) -> pd.DataFrame:
                       se a tabela não existir ou se ocorrer um erro.
     """
     try:
-        conn_str = _get_db_connection_string()
-        # Usa a função read_sql_table do pandas para ler a tabela.
-        df = pd.read_sql_table(nome_tabela, conn_str)
+        # Usa a função read_sql_table do pandas para ler a tabela (pela engine compartilhada).
+        df = pd.read_sql_table(nome_tabela, engine)
         logging.info(f"Sucesso: {len(df)} registros lidos da tabela '{nome_tabela}'.")
         return df
     except ValueError:
@@ -140,12 +292,19 @@ def _salvar_estado(nome_tarefa: str, estado: dict):
         estado (dict): Um dicionário contendo o estado a ser salvo (ex: {'ultima_data_concluida': '2025-01-10'}).
     """
     caminho_arquivo = os.path.join(cfg.STATE_DIR, f"{nome_tarefa}.json")
+    # Grava primeiro em um arquivo temporário e só então o troca pelo checkpoint (os.replace é
+    # atômico): se o processo morrer no meio da gravação, o checkpoint anterior continua íntegro.
+    caminho_temporario = f"{caminho_arquivo}.tmp.{os.getpid()}"
     try:
-        with open(caminho_arquivo, 'w') as f:
-            json.dump(estado, f, indent=4)
+        with open(caminho_temporario, 'wb') as f:
+            f.write(orjson.dumps(estado, option=orjson.OPT_INDENT_2))
+            f.flush()
+            os.fsync(f.fileno())  # Garante que o conteúdo está no disco antes da troca.
+        os.replace(caminho_temporario, caminho_arquivo)
         logging.info(f"Checkpoint salvo para a tarefa '{nome_tarefa}': {estado}")
     except Exception as e:
         logging.error(f"Falha ao salvar o estado para a tarefa '{nome_tarefa}': {e}", exc_info=True)
+        if os.path.exists(caminho_temporario): os.remove(caminho_temporario)
 
 def _carregar_estado(nome_tarefa: str) -> dict:
     """
@@ -181,24 +340,138 @@ def _limpar_estado(nome_tarefa: str):
         os.remove(caminho_arquivo)
         logging.info(f"Tarefa '{nome_tarefa}' concluída. Checkpoint removido.")
 
-def _concatenar_dfs_com_seguranca(df1: pd.DataFrame, df2: pd.DataFrame) -> pd.DataFrame:
+def _periodos_da_carga(ultima_data_concluida_str: str = None) -> list:
+    """
+    Gera de uma só vez os períodos (de SALES_FILE_DAYS_INTERVAL dias) de uma carga histórica,
+    de HISTORICAL_START_DATE (ou do período seguinte ao último concluído) até hoje.
+
+    Args:
+        ultima_data_concluida_str (str, optional): Início do último período concluído
+                                                   ('%Y-%m-%d'), vindo do checkpoint.
+
+    Returns:
+        list: Pares (data_inicio, data_fim) no formato '%Y-%m-%d'; o último termina hoje.
+    """
+    intervalo = timedelta(days=cfg.SALES_FILE_DAYS_INTERVAL)
+    data_inicio = pd.to_datetime(cfg.HISTORICAL_START_DATE)
+    if ultima_data_concluida_str:
+        data_inicio = datetime.strptime(ultima_data_concluida_str, '%Y-%m-%d') + intervalo
+    data_fim = datetime.now()
+
+    inicios = pd.date_range(data_inicio, data_fim, freq=intervalo)
+    # Cada período termina um dia antes do próximo começar, sem passar de hoje.
+    fins = inicios + (intervalo - timedelta(days=1))
+    fins = fins.where(fins <= data_fim, data_fim)
+    return list(zip(inicios.strftime('%Y-%m-%d'), fins.strftime('%Y-%m-%d')))
+
+def _concatenar_dfs_com_seguranca(*dfs: pd.DataFrame) -> pd.DataFrame:
     """
-    Concatena dois DataFrames de forma segura, tratando casos onde um ou ambos
-    podem estar vazios e alinhando as colunas.
+    Concatena DataFrames de forma segura, tratando casos onde alguns (ou todos)
+    podem estar vazios e alinhando as colunas. Recebe todas as partes de uma vez,
+    para que o resultado seja montado com uma única cópia dos dados.
 
     Returns:
         pd.DataFrame: O DataFrame resultante da concatenação.
     """
-    if df1.empty: return df2.copy()
-    if df2.empty: return df1.copy()
-    # Concatena e depois realinha as colunas para garantir a compatibilidade.
-    return pd.concat([df1, df2], ignore_index=True).reindex(columns=df1.columns.union(df2.columns))
+    dfs_validos = [df for df in dfs if not df.empty]
+    if not dfs_validos: return pd.DataFrame()
+    if len(dfs_validos) == 1: return dfs_validos[0].copy()
+    # O concat já alinha as colunas (faltantes viram NaN) e, só quando elas diferem, as ordena
+    # como a união; sem o 'reindex' posterior, que copiava todas as colunas mais uma vez.
+    return pd.concat(dfs_validos, ignore_index=True, sort=True)
+
+def _juntar_por_codigo(df: pd.DataFrame, chave: str, df_cadastro: pd.DataFrame, colunas: list):
+    """
+    Acrescenta a 'df' (no lugar) as 'colunas' do cadastro cujo 'codigo' é igual à coluna
+    'chave', como um 'merge' com how='left' (códigos não encontrados ficam NaN). Cada código
+    distinto é procurado uma única vez no índice do cadastro; as linhas só copiam o resultado.
+
+    Args:
+        df (pd.DataFrame): O DataFrame que recebe as colunas (alterado no lugar).
+        chave (str): A coluna de 'df' com o código a procurar.
+        df_cadastro (pd.DataFrame): O cadastro (vendedores, produtos), com a coluna 'codigo'.
+        colunas (list): As colunas do cadastro a acrescentar.
+    """
+    # Um código repetido no cadastro duplicaria as linhas no 'merge'; fica a última versão.
+    cadastro = df_cadastro.drop_duplicates(subset=['codigo'], keep='last').set_index('codigo')
+    posicoes, codigos_distintos = pd.factorize(df[chave])
+    # Linha do cadastro de cada código distinto (-1 = não encontrado, e também para chaves nulas).
+    linhas = np.append(cadastro.index.get_indexer(codigos_distintos), -1)[posicoes]
+    for col in colunas:
+        df[col] = pd.api.extensions.take(cadastro[col].to_numpy(), linhas, allow_fill=True)
+
+# Colunas de valores/quantidades que têm o sinal invertido nas devoluções.
+COLUNAS_INVERTER_DEVOLUCAO = ['valorTotalCusto', 'valorTotalBruto', 'valorTotalLiquido', 'valorTotal', 'quantidadeProdutos', 'valorDesconto']
+
+def _inverter_sinais_devolucao(df_devolvidas: pd.DataFrame):
+    """
+    Inverte (no próprio DataFrame) o sinal das colunas de valores das devoluções, para
+    que elas abatam do faturamento. Valores não numéricos viram 0, como antes.
+
+    Args:
+        df_devolvidas (pd.DataFrame): As notas devolvidas (alterado no lugar).
+    """
+    colunas = [col for col in COLUNAS_INVERTER_DEVOLUCAO if col in df_devolvidas.columns]
+    if not colunas:
+        return
+    valores = df_devolvidas[colunas]
+    # Colunas que já vieram numéricas da API (o normal) dispensam a conversão coluna a coluna.
+    if not all(pd.api.types.is_numeric_dtype(tipo) for tipo in valores.dtypes):
+        valores = valores.apply(pd.to_numeric, errors='coerce')
+    # Uma única operação sobre todas as colunas, em vez de uma atribuição por coluna.
+    df_devolvidas[colunas] = valores.fillna(0) * -1
+
+def _separar_cancelamentos(df_cancelados: pd.DataFrame) -> list:
+    """
+    Prepara as notas canceladas para gravação junto com as vendas: as devoluções ('D')
+    têm os sinais invertidos e status 'DEVOLUÇÃO'; as exclusões ('E') mantêm os valores
+    positivos e recebem status 'Excluída'.
+
+    Args:
+        df_cancelados (pd.DataFrame): As notas do endpoint de cancelamentos.
+
+    Returns:
+        list: As partes não vazias (devoluções e depois exclusões), prontas para concatenar.
+    """
+    partes = []
+    if df_cancelados.empty or 'tipoCancelamento' not in df_cancelados.columns:
+        return partes
+
+    # --- TRATAMENTO DE DEVOLUÇÕES ('D') ---
+    df_devolvidas = df_cancelados[df_cancelados['tipoCancelamento'] == 'D'].copy()
+    if not df_devolvidas.empty:
+        # Inverte sinais APENAS para devoluções (para abater do faturamento)
+        _inverter_sinais_devolucao(df_devolvidas)
+        df_devolvidas['status'] = 'DEVOLUÇÃO'
+        # Garante que numeroNotaOrigem seja preservado
+        if 'numeroNotaOrigem' not in df_devolvidas.columns: df_devolvidas['numeroNotaOrigem'] = None
+        partes.append(df_devolvidas)
+
+    # --- TRATAMENTO DE EXCLUSÕES ('E') ---
+    df_excluidas = df_cancelados[df_cancelados['tipoCancelamento'] == 'E'].copy()
+    if not df_excluidas.empty:
+        # NÃO INVERTE SINAIS. Mantém positivo para mostrar o valor da nota que foi excluída.
+        # O status 'Excluída' será usado no front-end para filtrar fora dos totais.
+        df_excluidas['status'] = 'Excluída'
+        if 'numeroNotaOrigem' not in df_excluidas.columns: df_excluidas['numeroNotaOrigem'] = None
+        partes.append(df_excluidas)
+    return partes
 
 
 # ==============================================================================
 # FUNÇÕES DE COMUNICAÇÃO COM A API
 # ==============================================================================
 
+# Sessão HTTP única do módulo: reaproveita as conexões (TCP/TLS) com a API entre as
+# requisições e já leva o token e a compressão gzip nos cabeçalhos padrão.
+# O pool comporta as buscas simultâneas (endpoints, páginas e período antecipado) das tarefas
+# que o orquestrador roda ao mesmo tempo; as retentativas ficam a cargo de 'realizar_requisicao_segura'.
+_SESSION = requests.Session()
+_adaptador_http = HTTPAdapter(pool_connections=16, pool_maxsize=32, max_retries=0)
+_SESSION.mount('https://', _adaptador_http)
+_SESSION.mount('http://', _adaptador_http)
+_SESSION.headers.update({'Authorization': f'Bearer {cfg.API_AUTH_TOKEN}', 'Accept-Encoding': 'gzip'})
+
 def realizar_requisicao_segura(url: str, params: dict = None, headers: dict = None):
     """
     Realiza uma requisição GET para a API de forma robusta, com um mecanismo
@@ -219,10 +492,8 @@ def realizar_requisicao_segura(url: str, params: dict = None, headers: dict = No
     intervalo_tentativas_s = 10
     espera_entre_ciclos_min = 5
     
-    # Adiciona o token de autorização aos cabeçalhos.
-    auth_headers = {'Authorization': f'Bearer {cfg.API_AUTH_TOKEN}'}
-    if headers: auth_headers.update(headers)
-    
+    # O token de autorização já está nos cabeçalhos padrão da sessão; aqui só entram os adicionais.
+
     logging.info(f"Iniciando requisição para a URL: {url}")
     if params: logging.info(f"Parâmetros: {params}")
 
@@ -231,7 +502,7 @@ def realizar_requisicao_segura(url: str, params: dict = None, headers: dict = No
         # Loop de tentativas dentro de um ciclo.
         for tentativa in range(1, tentativas_por_ciclo + 1):
             try:
-                response = requests.get(url, params=params, headers=auth_headers, timeout=30)
+                response = _SESSION.get(url, params=params, headers=headers, timeout=30)
                 response.raise_for_status()  # Lança um erro para status HTTP 4xx ou 5xx.
                 logging.info("Requisição bem-sucedida!")
                 return response.json()
@@ -247,11 +518,16 @@ def realizar_requisicao_segura(url: str, params: dict = None, headers: dict = No
     logging.error(f"Todas as {max_ciclos * tentativas_por_ciclo} tentativas de requisição para {url} falharam.")
     return None
 
+# Número de páginas pedidas à API ao mesmo tempo depois que a primeira página vem cheia.
+# Mantido baixo para não sobrecarregar a API.
+PAGINAS_SIMULTANEAS = 4
+
 def _buscar_dados_paginados(url: str, params: dict = None, headers: dict = None):
     """
     Busca todos os dados de um endpoint da API que utiliza paginação.
-    A função realiza requisições sequenciais, incrementando a página, até que
-    todos os dados tenham sido coletados.
+    A primeira página é buscada sozinha; se vier cheia, as seguintes são pedidas em
+    lotes de PAGINAS_SIMULTANEAS requisições paralelas (processadas em ordem) até
+    que uma página venha incompleta ou vazia.
 
     Args:
         url (str): A URL base do endpoint.
@@ -263,33 +539,79 @@ def _buscar_dados_paginados(url: str, params: dict = None, headers: dict = None)
                       em caso de falha crítica.
     """
     todos_os_dados = []
-    primeiro_registro = 0
     quantidade_registros = 999  # Tamanho da página.
-    params_paginacao = params.copy() if params else {}
-    
-    while True:
-        # Adiciona os parâmetros de paginação à requisição.
+
+    def buscar_pagina(primeiro_registro):
+        # Cada requisição recebe a sua própria cópia dos parâmetros de paginação.
+        params_paginacao = params.copy() if params else {}
         params_paginacao['primeiroRegistro'] = primeiro_registro
         params_paginacao['quantidadeRegistros'] = quantidade_registros
-        
         pagina_de_dados = realizar_requisicao_segura(url, params=params_paginacao, headers=headers)
-        
-        if pagina_de_dados is not None:
-            if not pagina_de_dados: break  # Se a página vier vazia, significa que não há mais dados.
-            
-            todos_os_dados.extend(pagina_de_dados)
-            
-            # Se a quantidade de dados recebidos for menor que o tamanho da página, é a última página.
-            if len(pagina_de_dados) < quantidade_registros: break
-            
-            # Prepara para a próxima página.
-            primeiro_registro += quantidade_registros
-        else:
-            # Em caso de falha na requisição segura, aborta a busca paginada.
+        if pagina_de_dados is None:
             logging.error(f"Falha crítica ao obter página de dados. URL: {url}, Params: {params_paginacao}")
-            return None
-            
-    return todos_os_dados
+        return pagina_de_dados
+
+    # Primeira página sozinha: a maioria das consultas (ex: atualizações recentes) cabe nela.
+    pagina_de_dados = buscar_pagina(0)
+    if pagina_de_dados is None: return None  # Em caso de falha na requisição segura, aborta a busca paginada.
+    todos_os_dados.extend(pagina_de_dados)
+    # Se a página vier vazia ou incompleta, não há mais dados.
+    if len(pagina_de_dados) < quantidade_registros: return todos_os_dados
+
+    proxima_pagina = 1
+    with ThreadPoolExecutor(max_workers=PAGINAS_SIMULTANEAS) as executor:
+        while True:
+            # Pede o próximo lote de páginas em paralelo; o 'map' devolve os resultados na ordem das páginas.
+            inicios = [(proxima_pagina + i) * quantidade_registros for i in range(PAGINAS_SIMULTANEAS)]
+            proxima_pagina += PAGINAS_SIMULTANEAS
+            for pagina_de_dados in executor.map(buscar_pagina, inicios):
+                if pagina_de_dados is None: return None  # Falha em uma página: aborta a busca paginada.
+                todos_os_dados.extend(pagina_de_dados)
+                # Página vazia ou incompleta: é a última. As páginas seguintes do lote (vazias) são ignoradas.
+                if len(pagina_de_dados) < quantidade_registros: return todos_os_dados
+
+def _buscar_em_paralelo(*buscas: tuple) -> list:
+    """
+    Executa ao mesmo tempo buscas paginadas independentes (ex: vendas alteradas e
+    canceladas do mesmo período), somando as esperas pela API uma única vez.
+
+    Args:
+        *buscas (tuple): Pares (url, params), um para cada busca.
+
+    Returns:
+        list: O resultado de '_buscar_dados_paginados' de cada busca, na ordem recebida.
+    """
+    with ThreadPoolExecutor(max_workers=len(buscas)) as executor:
+        futuros = [executor.submit(_buscar_dados_paginados, url, params=params) for url, params in buscas]
+        return [futuro.result() for futuro in futuros]
+
+def _buscar_periodos_antecipando(periodos: list, buscar_periodo):
+    """
+    Percorre os períodos de uma carga histórica entregando a busca de cada um, enquanto a
+    busca do período seguinte já acontece em segundo plano: a espera pela API se sobrepõe
+    à gravação do período atual. Os períodos continuam sendo entregues (e gravados) em ordem.
+
+    Args:
+        periodos (list): Pares (data_inicio, data_fim), como os de '_periodos_da_carga'.
+        buscar_periodo (callable): Função que recebe (data_inicio, data_fim) e faz a busca.
+
+    Yields:
+        tuple: (data_inicio, data_fim, resultado de 'buscar_periodo' para o período).
+               O gerador não guarda referência ao resultado entregue: assim que o chamador
+               o descarta, os registros brutos do período podem ser liberados.
+    """
+    executor = ThreadPoolExecutor(max_workers=1)
+    try:
+        # Com um único worker, a busca seguinte (já enfileirada) só começa quando a atual termina.
+        futuros = [executor.submit(buscar_periodo, *periodos[0])] if periodos else []
+        for indice, (data_inicio_str, data_fim_str) in enumerate(periodos):
+            if indice + 1 < len(periodos):
+                futuros.append(executor.submit(buscar_periodo, *periodos[indice + 1]))
+            # O futuro do período é retirado da lista antes da entrega (ele também guarda o resultado).
+            yield data_inicio_str, data_fim_str, futuros.pop(0).result()
+    finally:
+        # Se a carga parar no meio (ex: falha), não espera a busca antecipada terminar.
+        executor.shutdown(wait=False, cancel_futures=True)
 
 
 # ==============================================================================
@@ -305,37 +627,26 @@ def realizar_carga_historica_vendas():
     logging.info(f"\nIniciando carga completa das VENDAS...")
     
     estado = _carregar_estado(NOME_TAREFA)
-    ultima_data_concluida_str = estado.get('ultima_data_concluida')
-    
-    data_inicio_historico = pd.to_datetime(cfg.HISTORICAL_START_DATE)
-    data_inicio_loop = data_inicio_historico
-    if ultima_data_concluida_str:
-        data_inicio_loop = datetime.strptime(ultima_data_concluida_str, '%Y-%m-%d') + timedelta(days=cfg.SALES_FILE_DAYS_INTERVAL)
-    
-    data_fim_loop = datetime.now()
-    data_atual_periodo = data_inicio_loop
-    
-    df_existente = _ler_do_db(NOME_TABELA)
 
-    while data_atual_periodo <= data_fim_loop:
-        data_fim_periodo = data_atual_periodo + timedelta(days=cfg.SALES_FILE_DAYS_INTERVAL - 1)
-        if data_fim_periodo > data_fim_loop: data_fim_periodo = data_fim_loop
-        
-        data_inicio_str = data_atual_periodo.strftime('%Y-%m-%d')
-        data_fim_str = data_fim_periodo.strftime('%Y-%m-%d')
-        logging.info(f"\nProcessando período de {data_inicio_str} a {data_fim_str}")
-        
+    def buscar_periodo(data_inicio_str, data_fim_str):
         params_periodo = {"dataInicial": data_inicio_str, "dataFinal": data_fim_str}
         params_cancel_periodo = {"dataEmissaoInicial": data_inicio_str, "dataEmissaoFinal": data_fim_str}
-        
-        dados_vendas = _buscar_dados_paginados(cfg.VENDAS_ALT_ENDPOINT, params=params_periodo)
-        dados_cancelados = _buscar_dados_paginados(cfg.VENDAS_CANCEL_ENDPOINT, params=params_cancel_periodo)
+        # Vendas e cancelamentos do período são buscados ao mesmo tempo.
+        return _buscar_em_paralelo((cfg.VENDAS_ALT_ENDPOINT, params_periodo),
+                                   (cfg.VENDAS_CANCEL_ENDPOINT, params_cancel_periodo))
+
+    # Todos os períodos (já como texto) são gerados antes do loop; o seguinte é buscado
+    # enquanto o atual é gravado.
+    periodos = _periodos_da_carga(estado.get('ultima_data_concluida'))
+    for data_inicio_str, data_fim_str, (dados_vendas, dados_cancelados) in _buscar_periodos_antecipando(periodos, buscar_periodo):
+        logging.info(f"\nProcessando período de {data_inicio_str} a {data_fim_str}")
         
         if dados_vendas is None:
             logging.error("Falha ao buscar vendas para o período. A tarefa será retomada na próxima execução.")
             return
             
         df_vendas_periodo = pd.DataFrame(dados_vendas)
+        del dados_vendas  # Os registros brutos (dicionários) não são mais necessários depois do DataFrame.
         if not df_vendas_periodo.empty: 
             df_vendas_periodo['status'] = df_vendas_periodo.get('status', pd.Series(dtype='str')).fillna('OK')
             # Garante que a coluna numeroNotaOrigem exista mesmo em vendas normais (vazia)
@@ -343,54 +654,26 @@ def realizar_carga_historica_vendas():
                 df_vendas_periodo['numeroNotaOrigem'] = None
         
         # Processa os dados de cancelamento/devolução
+        # As partes do período são juntadas em uma única concatenação no final.
+        partes_periodo = [df_vendas_periodo]
         if dados_cancelados:
-            df_cancelados = pd.DataFrame(dados_cancelados)
-            if not df_cancelados.empty and 'tipoCancelamento' in df_cancelados.columns:
-                
-                # --- TRATAMENTO DE DEVOLUÇÕES ('D') ---
-                df_devolvidas = df_cancelados[df_cancelados['tipoCancelamento'] == 'D'].copy()
-                if not df_devolvidas.empty:
-                    # Inverte sinais APENAS para devoluções (para abater do faturamento)
-                    cols_inverter = ['valorTotalCusto', 'valorTotalBruto', 'valorTotalLiquido', 'valorTotal', 'quantidadeProdutos', 'valorDesconto']
-                    for col in cols_inverter:
-                        if col in df_devolvidas.columns: 
-                            df_devolvidas[col] = pd.to_numeric(df_devolvidas[col], errors='coerce').fillna(0) * -1
-                    
-                    df_devolvidas['status'] = 'DEVOLUÇÃO'
-                    # Garante que numeroNotaOrigem seja preservado
-                    if 'numeroNotaOrigem' not in df_devolvidas.columns:
-                        df_devolvidas['numeroNotaOrigem'] = None
-                        
-                    df_vendas_periodo = _concatenar_dfs_com_seguranca(df_vendas_periodo, df_devolvidas)
-
-                # --- TRATAMENTO DE EXCLUSÕES ('E') ---
-                df_excluidas = df_cancelados[df_cancelados['tipoCancelamento'] == 'E'].copy()
-                if not df_excluidas.empty:
-                    # NÃO INVERTE SINAIS. Mantém positivo para mostrar o valor da nota que foi excluída.
-                    # O status 'Excluída' será usado no front-end para filtrar fora dos totais.
-                    df_excluidas['status'] = 'Excluída'
-                    if 'numeroNotaOrigem' not in df_excluidas.columns:
-                        df_excluidas['numeroNotaOrigem'] = None
-
-                    df_vendas_periodo = _concatenar_dfs_com_seguranca(df_vendas_periodo, df_excluidas)
-                
-                if not df_vendas_periodo.empty:
-                    # Prevalência: Se existe o mesmo ID, a última versão (cancelada/devolvida) substitui a venda original OK
-                    df_vendas_periodo.drop_duplicates(subset=['numeroNota'], keep='last', inplace=True)
+            partes_periodo.extend(_separar_cancelamentos(pd.DataFrame(dados_cancelados)))
+        del dados_cancelados
+        # Prevalência: Se existe o mesmo ID, a última versão (cancelada/devolvida) substitui a venda original OK
+        # (resolvido na gravação, pelo índice único de 'numeroNota').
+        df_vendas_periodo = _concatenar_dfs_com_seguranca(*partes_periodo)
                     
         if not df_vendas_periodo.empty:
             try:
-                df_final = pd.concat([df_existente, df_vendas_periodo]).drop_duplicates(subset=['numeroNota'], keep='last')
-                _escrever_para_db(df_final, NOME_TABELA, if_exists='replace')
-                df_existente = df_final.copy()
+                # Grava só as notas do período; versões anteriores da mesma nota são substituídas.
+                _upsert_para_db(df_vendas_periodo, NOME_TABELA, 'numeroNota')
             except Exception as e:
                 logging.error(f"Falha ao salvar o período no banco de dados. Erro: {e}", exc_info=True)
                 return
         else:
             logging.info("Nenhuma venda nova para salvar neste período.")
             
-        _salvar_estado(NOME_TAREFA, {'ultima_data_concluida': data_atual_periodo.strftime('%Y-%m-%d')})
-        data_atual_periodo += timedelta(days=cfg.SALES_FILE_DAYS_INTERVAL)
+        _salvar_estado(NOME_TAREFA, {'ultima_data_concluida': data_inicio_str})
         
     logging.info(f"Tarefa '{NOME_TAREFA}' concluída com sucesso.")
     _limpar_estado(NOME_TAREFA)
@@ -399,63 +682,51 @@ def realizar_carga_historica_vendas():
 def atualizar_vendas_recentes():
     """
     Busca apenas as vendas do dia corrente.
+
+    Returns:
+        list: Os números das notas gravadas ou removidas (vazia se nada mudou).
     """
     NOME_TABELA = 'vendas'
     logging.info("\nIniciando atualização de vendas recentes...")
     
-    df_existente = _ler_do_db(NOME_TABELA)
     hoje_str = datetime.now().strftime('%Y-%m-%d')
 
     params_alt = {"dataInicial": hoje_str, "dataFinal": hoje_str}
-    dados_alterados = _buscar_dados_paginados(cfg.VENDAS_ALT_ENDPOINT, params=params_alt)
-    df_alterados = pd.DataFrame(dados_alterados) if dados_alterados else pd.DataFrame()
-
     params_cancel = {"dataEmissaoInicial": hoje_str, "dataEmissaoFinal": hoje_str}
-    dados_cancelados = _buscar_dados_paginados(cfg.VENDAS_CANCEL_ENDPOINT, params=params_cancel)
+    # As duas consultas são independentes: são feitas ao mesmo tempo.
+    dados_alterados, dados_cancelados = _buscar_em_paralelo((cfg.VENDAS_ALT_ENDPOINT, params_alt),
+                                                            (cfg.VENDAS_CANCEL_ENDPOINT, params_cancel))
+    df_alterados = pd.DataFrame(dados_alterados) if dados_alterados else pd.DataFrame()
     df_cancelados = pd.DataFrame(dados_cancelados) if dados_cancelados else pd.DataFrame()
 
     if df_alterados.empty and df_cancelados.empty:
         logging.info("Nenhuma venda nova, alterada ou cancelada para processar.")
-        return
+        return []
         
-    df_intermediario = df_existente.copy()
     ids_para_remover = set()
     if not df_alterados.empty:
         ids_para_remover.update(df_alterados['numeroNota'].unique())
     if not df_cancelados.empty:
         ids_para_remover.update(df_cancelados['numeroNota'].unique())
 
-    if ids_para_remover:
-        df_intermediario = df_intermediario[~df_intermediario['numeroNota'].isin(ids_para_remover)]
-
-    df_novos_e_atualizados = pd.DataFrame()
+    # As partes (alteradas, devolvidas, excluídas) são juntadas em uma única concatenação.
+    partes = []
 
     if not df_alterados.empty:
         df_alterados['status'] = df_alterados.get('status', pd.Series(dtype='str')).fillna('OK')
         if 'numeroNotaOrigem' not in df_alterados.columns: df_alterados['numeroNotaOrigem'] = None
-        df_novos_e_atualizados = _concatenar_dfs_com_seguranca(df_novos_e_atualizados, df_alterados)
+        partes.append(df_alterados)
 
-    if not df_cancelados.empty:
-        # --- TRATAMENTO DE DEVOLUÇÕES ---
-        df_devolvidas = df_cancelados[df_cancelados['tipoCancelamento'] == 'D'].copy()
-        if not df_devolvidas.empty:
-            cols_inverter = ['valorTotalCusto', 'valorTotalBruto', 'valorTotalLiquido', 'valorTotal', 'quantidadeProdutos', 'valorDesconto']
-            for col in cols_inverter:
-                if col in df_devolvidas.columns: df_devolvidas[col] = pd.to_numeric(df_devolvidas[col], errors='coerce').fillna(0) * -1
-            df_devolvidas['status'] = 'DEVOLUÇÃO'
-            if 'numeroNotaOrigem' not in df_devolvidas.columns: df_devolvidas['numeroNotaOrigem'] = None
-            df_novos_e_atualizados = _concatenar_dfs_com_seguranca(df_novos_e_atualizados, df_devolvidas)
-            
-        # --- TRATAMENTO DE EXCLUSÕES ---
-        df_excluidas = df_cancelados[df_cancelados['tipoCancelamento'] == 'E'].copy()
-        if not df_excluidas.empty:
-            df_excluidas['status'] = 'Excluída'
-            if 'numeroNotaOrigem' not in df_excluidas.columns: df_excluidas['numeroNotaOrigem'] = None
-            df_novos_e_atualizados = _concatenar_dfs_com_seguranca(df_novos_e_atualizados, df_excluidas)
+    partes.extend(_separar_cancelamentos(df_cancelados))
 
-    df_final = _concatenar_dfs_com_seguranca(df_intermediario, df_novos_e_atualizados)
-    df_final.drop_duplicates(subset=['numeroNota'], keep='last', inplace=True)
-    _escrever_para_db(df_final, NOME_TABELA, if_exists='replace')
+    df_novos_e_atualizados = _concatenar_dfs_com_seguranca(*partes)
+
+    # As notas alteradas/canceladas saem da tabela e as novas versões entram, só nestas linhas
+    # (se a mesma nota vier mais de uma vez, a última versão prevalece na gravação).
+    versao_vendas_anterior = _versao_tabelas.get(NOME_TABELA)
+    _upsert_para_db(df_novos_e_atualizados, NOME_TABELA, 'numeroNota', chaves_para_remover=ids_para_remover)
+    # Só estas notas precisam ser reprocessadas na tabela analítica (ver 'processar_e_salvar_dados_analiticos_incremental').
+    return _registrar_notas_alteradas(ids_para_remover, versao_vendas_anterior)
 
 
 def sincronizar_produtos(carga_inicial=False):
@@ -482,15 +753,22 @@ def sincronizar_produtos(carga_inicial=False):
         hoje_str = datetime.now().strftime('%Y-%m-%d')
         params = {"dataInicial": hoje_str, "dataFinal": hoje_str}
         dados_alterados = _buscar_dados_paginados(cfg.PRODUTO_ALT_ENDPOINT, params=params)
-        if not dados_alterados:
-            logging.info("Nenhum produto alterado para sincronizar.")
-            return
-        # Lógica de atualização: junta os produtos existentes com os alterados,
-        # mantendo a versão mais recente em caso de duplicatas.
-        df_alterados = pd.DataFrame(dados_alterados)
-        df_existente = _ler_do_db(NOME_TABELA)
-        df_final = pd.concat([df_existente, df_alterados]).drop_duplicates(subset=['codigo'], keep='last')
-        _escrever_para_db(df_final, NOME_TABELA, if_exists='replace')
+        _gravar_produtos_alterados(dados_alterados)
+
+def _gravar_produtos_alterados(dados_alterados: list):
+    """
+    Grava na tabela 'produtos' os produtos alterados retornados pela API.
+
+    Args:
+        dados_alterados (list): Os registros do endpoint de produtos alterados (ou None).
+    """
+    if not dados_alterados:
+        logging.info("Nenhum produto alterado para sincronizar.")
+        return
+    # Lógica de atualização: grava só os produtos alterados, substituindo
+    # a versão existente de cada código.
+    df_alterados = pd.DataFrame(dados_alterados)
+    _upsert_para_db(df_alterados, 'produtos', 'codigo')
 
 def sincronizar_vendedores():
     """
@@ -506,41 +784,38 @@ def sincronizar_vendedores():
     else:
         logging.error("Falha ao obter a lista de vendedores da API.")
 
-def processar_e_salvar_dados_analiticos():
-    """
-    Processa os dados brutos e salva na tabela 'vendas_processadas'.
-    """
-    logging.info("Iniciando o reprocessamento dos dados para análise...")
-    conn_str = _get_db_connection_string()
-    
-    try:
-        df_vendas = pd.read_sql_table('vendas', conn_str)
-        df_vendedores = pd.read_sql_table('vendedores', conn_str)
-        df_produtos = pd.read_sql_table('produtos', conn_str)
-    except ValueError as e:
-        logging.warning(f"Tabelas brutas incompletas: {e}")
-        return
-    except Exception as e:
-        logging.error(f"Erro crítico: {e}", exc_info=True)
-        return
-
-    if df_vendas.empty:
-        _escrever_para_db(pd.DataFrame(), 'vendas_processadas', if_exists='replace')
-        return
-
-    def safe_json_loads(s):
-        if isinstance(s, str):
+# Número de notas da tabela 'vendas' lidas e transformadas por vez em 'processar_e_salvar_dados_analiticos'.
+# Os textos JSON, os itens decodificados e o 'explode' de cada lote são descartados antes do
+# próximo, em vez de coexistirem para a tabela inteira.
+LOTE_PROCESSAMENTO_VENDAS = 20_000
+
+# Colunas de 'vendas_processadas' com poucos valores distintos (repetidos em todos os itens).
+COLUNAS_CATEGORICAS_PROCESSADAS = ['status_venda', 'entrega', 'condicaoPagamento_nome', 'codigoVendedor', 'codigoProduto',
+                                   'nome', 'nomeVendedor', 'nomeGrupo', 'nomeCategoria']
+
+def _safe_json_loads(s):
+    if isinstance(s, (str, bytes)):
+        try: return orjson.loads(s)
+        except orjson.JSONDecodeError:
+            # Textos gravados por versões antigas (com json.dumps) podem ter NaN/Infinity,
+            # que o orjson não aceita.
             try: return json.loads(s)
             except (json.JSONDecodeError, TypeError): return None
-        return s
+    return s
 
+def _processar_lote_vendas(df_vendas: pd.DataFrame, df_vendedores: pd.DataFrame, df_produtos_para_merge: pd.DataFrame) -> pd.DataFrame:
+    """
+    Transforma um lote de notas da tabela 'vendas' nas linhas de 'vendas_processadas'
+    (uma por item, já com os nomes de vendedor e produto).
+    """
+    # Uma compreensão de lista sobre o array evita o custo do 'apply' do pandas a cada linha.
     for col in ['itens', 'condicaoPagamento']:
-        if col in df_vendas.columns: df_vendas[col] = df_vendas[col].apply(safe_json_loads)
+        if col in df_vendas.columns: df_vendas[col] = [_safe_json_loads(s) for s in df_vendas[col].to_numpy()]
 
     # Explode a tabela de vendas
     if 'itens' in df_vendas.columns:
         if 'condicaoPagamento' in df_vendas.columns:
-            df_vendas['condicaoPagamento_nome'] = df_vendas['condicaoPagamento'].apply(lambda x: x.get('nome') if isinstance(x, dict) else None)
+            df_vendas['condicaoPagamento_nome'] = [x.get('nome') if isinstance(x, dict) else None for x in df_vendas['condicaoPagamento'].to_numpy()]
         
         # Garante que numeroNotaOrigem esteja na lista de colunas a serem preservadas
         cols_preservar = ['numeroNota', 'dataEmissao', 'horaEmissao', 'codigoVendedor', 'codigoCliente', 'entrega', 'status', 'condicaoPagamento_nome', 'numeroNotaFiscal', 'numeroNotaOrigem']
@@ -548,8 +823,17 @@ def processar_e_salvar_dados_analiticos():
         colunas_venda = [col for col in cols_preservar if col in df_vendas.columns]
         
         df_vendas = df_vendas.explode('itens').reset_index(drop=True)
-        df_itens_normalized = pd.json_normalize(df_vendas['itens'])
-        
+        # Vendas sem itens viram uma linha vazia (como no json_normalize).
+        itens = [item if isinstance(item, dict) else {} for item in df_vendas['itens'].to_numpy()]
+        # O construtor do DataFrame monta as colunas direto dos itens (planos, no caso normal).
+        df_itens_normalized = pd.DataFrame(itens)
+        # Só colunas de objetos que não sejam texto/números podem ter campos aninhados; se algum
+        # existir, o json_normalize achata as chaves ('a.b') como antes.
+        colunas_suspeitas = [col for col in df_itens_normalized.select_dtypes(include=['object']).columns
+                             if infer_dtype(df_itens_normalized[col], skipna=True) not in _TIPOS_SEM_OBJETOS]
+        if any(isinstance(valor, dict) for col in colunas_suspeitas for valor in df_itens_normalized[col].to_numpy()):
+            df_itens_normalized = pd.json_normalize(itens)
+
         if 'codigoVendedor' in df_itens_normalized.columns:
             df_itens_normalized = df_itens_normalized.drop(columns=['codigoVendedor'])
             
@@ -557,57 +841,338 @@ def processar_e_salvar_dados_analiticos():
 
     df_vendas['codigoVendedor'] = df_vendas['codigoVendedor'].astype(str)
     df_vendas['codigoProduto'] = df_vendas.get('codigoProduto', pd.Series(dtype='str')).astype(str)
-    df_vendas['entrega'] = df_vendas.get('entrega', pd.Series(dtype=bool)).map({True: 'SIM', False: 'NÃO'}).fillna('NÃO')
+    # Uma única comparação sobre o array: só True (ou 1, como o SQLite grava) vira 'SIM'; False,
+    # nulos e a falta da coluna viram 'NÃO', como no antigo 'map' + 'fillna'.
+    entregas = df_vendas['entrega'].to_numpy() if 'entrega' in df_vendas.columns else np.zeros(len(df_vendas), dtype=bool)
+    df_vendas['entrega'] = np.where(entregas == True, 'SIM', 'NÃO').astype(object)  # noqa: E712 (comparação elemento a elemento)
     df_vendas.rename(columns={'status': 'status_venda'}, inplace=True)
     df_vendas['status_venda'] = df_vendas.get('status_venda', pd.Series(dtype='str')).fillna('OK')
 
-    df_vendedores.rename(columns={'nome': 'nomeVendedor'}, inplace=True)
-    df_vendedores['codigo'] = df_vendedores['codigo'].astype(str)
-    
-    if not df_produtos.empty:
-        colunas_produtos_interesse = ['codigo', 'nome', 'nomeGrupo', 'nomeCategoria']
-        colunas_existentes = [col for col in colunas_produtos_interesse if col in df_produtos.columns]
-        df_produtos_para_merge = df_produtos[colunas_existentes].copy()
-        df_produtos_para_merge.rename(columns={'nome': 'nome_produto'}, inplace=True)
-        df_produtos_para_merge['codigo'] = df_produtos_para_merge['codigo'].astype(str)
-    else:
-        df_produtos_para_merge = pd.DataFrame(columns=['codigo'])
-
-    df_merged = pd.merge(df_vendas, df_vendedores[['codigo', 'nomeVendedor']], left_on='codigoVendedor', right_on='codigo', how='left')
-    df_merged['nomeVendedor'] = df_merged['nomeVendedor'].fillna('Não encontrado')
+    # Busca os nomes nos cadastros por código (sem 'merge', que copiava a tabela inteira duas vezes).
+    df_final = df_vendas
+    _juntar_por_codigo(df_final, 'codigoVendedor', df_vendedores, ['nomeVendedor'])
+    df_final['nomeVendedor'] = df_final['nomeVendedor'].fillna('Não encontrado')
     
-    df_final = pd.merge(df_merged, df_produtos_para_merge, left_on='codigoProduto', right_on='codigo', how='left')
+    _juntar_por_codigo(df_final, 'codigoProduto', df_produtos_para_merge, [col for col in df_produtos_para_merge.columns if col != 'codigo'])
     
     if 'nome_produto' in df_final.columns:
         if 'nome' not in df_final.columns: df_final['nome'] = None 
-    df_final['nome'].fillna(df_final['nome_produto'], inplace=True)
+    df_final['nome'] = df_final['nome'].fillna(df_final['nome_produto'])
 
     if 'nomeGrupo' not in df_final.columns: df_final['nomeGrupo'] = 'Não encontrado'
     if 'nomeCategoria' not in df_final.columns: df_final['nomeCategoria'] = 'Sem Categoria'
-    df_final['nomeGrupo'].fillna('Não encontrado', inplace=True)
-    df_final['nomeCategoria'].fillna('Sem Categoria', inplace=True)
+    df_final['nomeGrupo'] = df_final['nomeGrupo'].fillna('Não encontrado')
+    df_final['nomeCategoria'] = df_final['nomeCategoria'].fillna('Sem Categoria')
 
-    df_final.drop(columns=['codigo_x', 'codigo_y', 'codigo', 'nome_produto'], errors='ignore', inplace=True)
+    # Sem 'merge' não há mais as colunas 'codigo_x'/'codigo_y'; sai só o nome auxiliar do produto
+    # (e um eventual 'codigo' vindo dos itens).
+    df_final.drop(columns=['codigo', 'nome_produto'], errors='ignore', inplace=True)
 
     # Reforço da lógica de valores negativos para DEVOLUÇÃO
     # Para EXCLUÍDA, mantemos o valor positivo (não invertemos aqui), pois o filtro do frontend vai ignorá-la nos totais
     colunas_financeiras = ['valorTotalCusto', 'valorTotalBruto', 'valorTotalLiquido', 'quantidadeProdutos']
+    # A máscara das devoluções é calculada uma única vez, e o sinal é ajustado direto nos arrays
+    # (sem o '.loc' com máscara, que selecionava e atribuía as linhas de novo a cada coluna).
+    devolucoes = (df_final['status_venda'] == 'DEVOLUÇÃO').to_numpy()
     for col in colunas_financeiras:
         if col in df_final.columns:
-            df_final[col] = pd.to_numeric(df_final[col], errors='coerce').fillna(0)
-            devolucoes = (df_final['status_venda'] == 'DEVOLUÇÃO')
+            valores = pd.to_numeric(df_final[col], errors='coerce').fillna(0).to_numpy(copy=True)
             # Garante que seja negativo
-            df_final.loc[devolucoes, col] = -df_final.loc[devolucoes, col].abs()
+            valores[devolucoes] = -np.abs(valores[devolucoes])
+            df_final[col] = valores
+    return df_final
+
+# Cadastros já preparados para o enriquecimento das vendas, junto com as versões das tabelas
+# de origem. Os DataFrames guardados são apenas lidos pelo processamento, nunca alterados.
+_cache_cadastros = {}
+
+def _carregar_cadastros_para_merge() -> tuple:
+    """
+    Lê e prepara os cadastros de vendedores e produtos usados no enriquecimento das vendas.
+    Enquanto as tabelas 'vendedores' e 'produtos' não forem regravadas por este processo,
+    devolve os mesmos DataFrames da leitura anterior, sem ir ao banco.
+
+    Returns:
+        tuple: (df_vendedores, df_produtos_para_merge), com a coluna 'codigo' como texto.
+    """
+    # A versão é tomada antes da leitura: uma gravação concorrente invalida o que for lido agora.
+    versoes = (_versao_tabelas.get('vendedores'), _versao_tabelas.get('produtos'))
+    versoes_guardadas, cadastros = _cache_cadastros.get('cadastros', (None, None))
+    if cadastros is not None and versoes_guardadas == versoes:
+        return cadastros
+
+    # Dos cadastros só são lidas as colunas usadas no enriquecimento das vendas.
+    df_vendedores = pd.read_sql_table('vendedores', engine, columns=['codigo', 'nome'])
+    colunas_produtos_interesse = ['codigo', 'nome', 'nomeGrupo', 'nomeCategoria']
+    colunas_produtos_tabela = {coluna['name'] for coluna in inspect(engine).get_columns('produtos')}
+    colunas_existentes = [col for col in colunas_produtos_interesse if col in colunas_produtos_tabela]
+    df_produtos = pd.read_sql_table('produtos', engine, columns=colunas_existentes)
+
+    df_vendedores.rename(columns={'nome': 'nomeVendedor'}, inplace=True)
+    df_vendedores['codigo'] = df_vendedores['codigo'].astype(str)
+
+    if not df_produtos.empty:
+        df_produtos_para_merge = df_produtos.rename(columns={'nome': 'nome_produto'})
+        df_produtos_para_merge['codigo'] = df_produtos_para_merge['codigo'].astype(str)
+    else:
+        df_produtos_para_merge = pd.DataFrame(columns=['codigo'])
+
+    # Versões e DataFrames são guardados juntos (uma única atribuição) para nunca se desencontrarem.
+    _cache_cadastros['cadastros'] = (versoes, (df_vendedores, df_produtos_para_merge))
+    return df_vendedores, df_produtos_para_merge
+
+# Tabelas das quais a 'vendas_processadas' é derivada. As atualizações só de estoque em
+# 'produtos' têm versão própria ('produtos_estoque') e ficam de fora: a análise não usa o estoque.
+TABELAS_ORIGEM_ANALITICA = ('vendas', 'vendedores', 'produtos')
+# Versões dessas tabelas usadas no último reprocessamento concluído (None: nenhum desde o início do processo).
+_versoes_ultimo_processamento = None
+
+# Notas gravadas por 'atualizar_vendas_recentes' desde o último processamento, junto com a versão
+# da tabela 'vendas' depois da última delas: (versão, frozenset de notas). Fica None quando
+# 'vendas' foi gravada por outro caminho, e aí só o reprocessamento completo é confiável.
+_notas_pendentes_analise = None
 
+def _registrar_notas_alteradas(notas, versao_vendas_anterior) -> list:
+    """
+    Acrescenta as notas recém-gravadas às pendentes de reprocessamento, desde que a gravação
+    anterior de 'vendas' também esteja coberta por elas (ou pelo último processamento).
+
+    Args:
+        notas (iterable): Os números das notas gravadas ou removidas.
+        versao_vendas_anterior: A versão de 'vendas' antes desta gravação.
+
+    Returns:
+        list: Os números das notas, como tipos do Python.
+    """
+    global _notas_pendentes_analise
+    notas = [nota.item() if hasattr(nota, 'item') else nota for nota in notas]
+    pendentes = _notas_pendentes_analise
+    if pendentes is not None and pendentes[0] == versao_vendas_anterior:
+        _notas_pendentes_analise = (_versao_tabelas.get('vendas'), pendentes[1].union(notas))
+    else:
+        _notas_pendentes_analise = None
+    return notas
+
+def _versoes_origem_analitica() -> tuple:
+    """
+    Retorna as versões atuais (ver '_marcar_tabela_alterada') das tabelas de origem da análise.
+    """
+    return tuple(_versao_tabelas.get(nome_tabela) for nome_tabela in TABELAS_ORIGEM_ANALITICA)
+
+def dados_analiticos_desatualizados() -> bool:
+    """
+    Indica se a tabela 'vendas_processadas' precisa ser reprocessada: alguma das tabelas de
+    origem foi gravada por este processo depois do último reprocessamento concluído, ou
+    ainda não houve nenhum reprocessamento desde o início do processo.
+
+    Returns:
+        bool: True se o reprocessamento for necessário.
+    """
+    return _versoes_ultimo_processamento is None or _versoes_ultimo_processamento != _versoes_origem_analitica()
+
+def processar_e_salvar_dados_analiticos() -> bool:
+    """
+    Processa os dados brutos e salva na tabela 'vendas_processadas'.
+
+    Returns:
+        bool: True se a tabela foi atualizada; False se a leitura dos dados brutos falhou
+              (o erro é registrado no log).
+    """
+    global _versoes_ultimo_processamento, _notas_pendentes_analise
+    logging.info("Iniciando o reprocessamento dos dados para análise...")
+    # As versões são tomadas antes da leitura: o que for gravado durante o reprocessamento
+    # deixa os dados desatualizados para a próxima verificação.
+    versoes_origem = _versoes_origem_analitica()
+    
+    try:
+        df_vendedores, df_produtos_para_merge = _carregar_cadastros_para_merge()
+        # As vendas são lidas e transformadas em lotes (os cadastros, pequenos, vão inteiros).
+        lotes_vendas = pd.read_sql_table('vendas', engine, chunksize=LOTE_PROCESSAMENTO_VENDAS)
+    except (ValueError, NoSuchTableError) as e:
+        logging.warning(f"Tabelas brutas incompletas: {e}")
+        return False
+    except Exception as e:
+        logging.error(f"Erro crítico: {e}", exc_info=True)
+        return False
+
+    partes = [_processar_lote_vendas(df_vendas, df_vendedores, df_produtos_para_merge) for df_vendas in lotes_vendas if not df_vendas.empty]
+    if not partes:
+        _escrever_para_db(pd.DataFrame(), 'vendas_processadas', if_exists='replace')
+        _versoes_ultimo_processamento = versoes_origem
+        _notas_pendentes_analise = (versoes_origem[0], frozenset())
+        return True
+    df_final = partes[0] if len(partes) == 1 else pd.concat(partes, ignore_index=True)
+    del partes
+
+    # Colunas de texto com poucos valores distintos passam a categóricas (códigos inteiros + a lista
+    # de valores): a tabela ocupa bem menos memória até ser gravada e a ordenação só move os códigos.
+    # No banco elas continuam gravadas como texto.
+    for col in COLUNAS_CATEGORICAS_PROCESSADAS:
+        if col in df_final.columns and df_final[col].dtype == object:
+            df_final[col] = df_final[col].astype('category')
+
+    # Grava as vendas em ordem de data (estável: os itens de cada nota mantêm a ordem), para que
+    # o painel as carregue já ordenadas e filtre os períodos por busca binária sem reordenar.
+    if 'dataEmissao' in df_final.columns:
+        df_final = df_final.sort_values('dataEmissao', kind='stable', na_position='last', ignore_index=True)
     _escrever_para_db(df_final, 'vendas_processadas', if_exists='replace')
+    _versoes_ultimo_processamento = versoes_origem
+    # A tabela inteira reflete 'vendas' nesta versão: nenhuma nota fica pendente.
+    _notas_pendentes_analise = (versoes_origem[0], frozenset())
     logging.info(f"Sucesso! Tabela 'vendas_processadas' atualizada.")
+    _atualizar_agregados_do_painel()
+    return True
+
+def _atualizar_agregados_do_painel():
+    """
+    Recria os agregados do painel já com os novos dados, para que a primeira requisição
+    depois da atualização não precise agrupar as vendas.
+    """
+    try:
+        atualizar_agregados(engine, forcar=True)
+        logging.info("Sucesso! Agregados de vendas do painel atualizados.")
+    except Exception as e:
+        logging.error(f"Falha ao atualizar os agregados de vendas do painel: {e}", exc_info=True)
+
+# Quantidade de notas por 'DELETE ... IN (...)' (abaixo do limite de parâmetros do SQLite).
+LOTE_NOTAS_REMOCAO = 500
+
+def processar_e_salvar_dados_analiticos_incremental() -> bool:
+    """
+    Atualiza a tabela 'vendas_processadas' reprocessando apenas as notas gravadas por
+    'atualizar_vendas_recentes' desde o último processamento: as linhas delas são apagadas
+    e as novas versões inseridas, em uma única transação. Se não houver como garantir que
+    essas notas são tudo o que mudou (nenhum processamento completo ainda, cadastros
+    regravados, 'vendas' gravada por outro caminho), faz o reprocessamento completo.
+
+    Returns:
+        bool: True se a tabela ficou em dia; False se a leitura dos dados brutos falhou
+              (o erro é registrado no log). Falhas na gravação são relançadas.
+    """
+    global _versoes_ultimo_processamento, _notas_pendentes_analise
+    versoes_origem = _versoes_origem_analitica()
+    pendentes = _notas_pendentes_analise
+    if (_versoes_ultimo_processamento is None or pendentes is None or pendentes[0] != versoes_origem[0]
+            or _versoes_ultimo_processamento[1:] != versoes_origem[1:]):
+        return processar_e_salvar_dados_analiticos()
+
+    notas = list(pendentes[1])
+    if not notas:
+        _versoes_ultimo_processamento = versoes_origem
+        return True
+    logging.info(f"Iniciando o reprocessamento de {len(notas)} notas alteradas para análise...")
+
+    try:
+        with engine.connect() as conn:
+            colunas_tabela = [linha[1] for linha in conn.exec_driver_sql('PRAGMA table_info("vendas_processadas")')]
+        if not colunas_tabela:
+            # Sem a tabela analítica não há o que atualizar por partes.
+            return processar_e_salvar_dados_analiticos()
+        df_vendedores, df_produtos_para_merge = _carregar_cadastros_para_merge()
+        # A tabela refletida dá às colunas os mesmos tipos da leitura completa ('read_sql_table').
+        tabela_vendas = Table('vendas', MetaData(), autoload_with=engine)
+        df_vendas = pd.read_sql_query(select(tabela_vendas).where(tabela_vendas.c.numeroNota.in_(notas)), engine)
+    except (ValueError, NoSuchTableError) as e:
+        logging.warning(f"Tabelas brutas incompletas: {e}")
+        return False
+    except Exception as e:
+        logging.error(f"Erro crítico: {e}", exc_info=True)
+        return False
+
+    # Notas excluídas sem nova versão não têm mais linhas em 'vendas': só são apagadas.
+    df_final = _processar_lote_vendas(df_vendas, df_vendedores, df_produtos_para_merge) if not df_vendas.empty else pd.DataFrame()
+    if 'dataEmissao' in df_final.columns:
+        df_final = df_final.sort_values('dataEmissao', kind='stable', na_position='last', ignore_index=True)
+
+    try:
+        with engine.begin() as conn:
+            for inicio in range(0, len(notas), LOTE_NOTAS_REMOCAO):
+                lote = tuple(notas[inicio:inicio + LOTE_NOTAS_REMOCAO])
+                conn.exec_driver_sql(f'DELETE FROM vendas_processadas WHERE "numeroNota" IN ({",".join("?" * len(lote))})', lote)
+            if not df_final.empty:
+                # Colunas que surgiram nos itens depois da criação da tabela são acrescentadas a ela.
+                for col in df_final.columns:
+                    if col not in colunas_tabela:
+                        conn.exec_driver_sql(f'ALTER TABLE vendas_processadas ADD COLUMN "{col}"')
+                _converter_objetos_para_json(df_final).to_sql('vendas_processadas', conn, if_exists='append', index=False,
+                                                              method=_inserir_em_lote, chunksize=ESCRITA_CHUNKSIZE)
+    except Exception as e:
+        logging.error(f"Falha ao atualizar as notas alteradas na tabela 'vendas_processadas': {e}", exc_info=True)
+        raise
+    finally:
+        _marcar_tabela_alterada('vendas_processadas')
+
+    _versoes_ultimo_processamento = versoes_origem
+    _notas_pendentes_analise = (versoes_origem[0], frozenset())
+    logging.info(f"Sucesso! {len(df_final)} linhas de {len(notas)} notas atualizadas na tabela 'vendas_processadas'.")
+    _atualizar_agregados_do_painel()
+    return True
+
+def conferir_vendas_processadas() -> bool:
+    """
+    Confere, nota a nota, se a tabela 'vendas_processadas', mantida pelas atualizações
+    incrementais (ver 'processar_e_salvar_dados_analiticos_incremental'), corresponde à
+    tabela 'vendas': cada nota deve ter o mesmo status e uma linha por item (ou uma só, se
+    não tiver itens), e não pode haver notas que não existam mais em 'vendas'. A conferência
+    é feita por uma única consulta no SQLite, sem reprocessar as vendas.
+    Se houver diferença, o próximo ciclo de vendas faz o reprocessamento completo.
+    A conferência só vale para dados já processados e sem gravações nas tabelas de origem
+    enquanto ela roda; fora disso, é dispensada.
+
+    Returns:
+        bool: False se a tabela divergir da tabela 'vendas'; True caso contrário.
+    """
+    global _versoes_ultimo_processamento
+    versoes_origem = _versoes_origem_analitica()
+    if _versoes_ultimo_processamento != versoes_origem:
+        # Há alterações ainda não processadas (ou nenhum processamento desde o início): nada a conferir.
+        return True
+
+    with engine.connect() as conn:
+        colunas_vendas = {linha[1] for linha in conn.exec_driver_sql('PRAGMA table_info("vendas")')}
+        colunas_processadas = {linha[1] for linha in conn.exec_driver_sql('PRAGMA table_info("vendas_processadas")')}
+        if not colunas_vendas:
+            return True
+        if not colunas_processadas:
+            divergentes = 1 if conn.exec_driver_sql('SELECT 1 FROM vendas LIMIT 1').first() else 0
+        else:
+            # Linhas esperadas por nota, como no 'explode' de '_processar_lote_vendas': uma por item da
+            # lista, ou uma só para listas vazias e itens ausentes. Textos que o SQLite não reconhece
+            # como JSON (NaN de versões antigas) ficam sem contagem e só têm o status conferido.
+            if 'itens' in colunas_vendas:
+                linhas_esperadas = ("CASE WHEN itens IS NULL THEN 1 WHEN json_valid(itens) THEN "
+                                    "CASE WHEN json_type(itens) = 'array' THEN MAX(json_array_length(itens), 1) ELSE 1 END END")
+            else:
+                linhas_esperadas = '1'
+            status_esperado = "COALESCE(status, 'OK')" if 'status' in colunas_vendas else "'OK'"
+            divergentes = conn.exec_driver_sql(f"""
+                WITH esperadas AS (
+                    SELECT "numeroNota", {status_esperado} AS status_venda, {linhas_esperadas} AS linhas FROM vendas),
+                processadas AS (
+                    SELECT "numeroNota", MIN(status_venda) AS status_min, MAX(status_venda) AS status_max, COUNT(*) AS linhas
+                    FROM vendas_processadas GROUP BY "numeroNota")
+                SELECT (SELECT COUNT(*) FROM esperadas e LEFT JOIN processadas p ON p."numeroNota" = e."numeroNota"
+                        WHERE p."numeroNota" IS NULL OR p.status_min IS NOT e.status_venda OR p.status_max IS NOT e.status_venda
+                           OR (e.linhas IS NOT NULL AND p.linhas <> e.linhas))
+                     + (SELECT COUNT(*) FROM processadas p
+                        WHERE NOT EXISTS (SELECT 1 FROM vendas v WHERE v."numeroNota" = p."numeroNota"))""").scalar()
+
+    if _versoes_ultimo_processamento != versoes_origem or _versoes_origem_analitica() != versoes_origem:
+        # Houve gravações durante a conferência: o resultado não vale (será refeita na próxima).
+        return True
+    if divergentes:
+        logging.warning(f"A tabela 'vendas_processadas' diverge da tabela 'vendas' ({divergentes} notas). "
+                        "O próximo ciclo de vendas fará o reprocessamento completo.")
+        _versoes_ultimo_processamento = None
+        return False
+    logging.info("Conferência da tabela 'vendas_processadas': todas as notas correspondem à tabela 'vendas'.")
+    return True
 
 def sincronizar_estoque():
     """
     Busca as alterações de estoque do dia e atualiza a coluna 'quantidadeEstoque'
     na tabela 'produtos'.
     """
-    NOME_TABELA = 'produtos'
     logging.info("\nIniciando sincronização de estoque...")
 
     hoje_str = datetime.now().strftime('%Y-%m-%d')
@@ -615,7 +1180,17 @@ def sincronizar_estoque():
     
     # Busca dados do endpoint de alteração de estoque.
     dados_estoque = _buscar_dados_paginados(cfg.ESTOQUE_ALT_ENDPOINT, params=params)
+    _gravar_estoque(dados_estoque)
 
+def _gravar_estoque(dados_estoque: list):
+    """
+    Atualiza a coluna 'quantidadeEstoque' da tabela 'produtos' com as alterações de
+    estoque retornadas pela API.
+
+    Args:
+        dados_estoque (list): Os registros do endpoint de alteração de estoque (ou None).
+    """
+    NOME_TABELA = 'produtos'
     if not dados_estoque:
         logging.info("Nenhuma alteração de estoque para sincronizar.")
         return
@@ -623,29 +1198,58 @@ def sincronizar_estoque():
     df_estoque = pd.DataFrame(dados_estoque)
     logging.info(f"Encontrados {len(df_estoque)} registros de estoque alterado.")
 
-    df_produtos = _ler_do_db(NOME_TABELA)
-    if df_produtos.empty:
-        logging.warning("A tabela de produtos está vazia. Não é possível atualizar o estoque. Execute a carga de produtos primeiro.")
-        return
-
     # Prepara os dados de estoque para a atualização.
     df_estoque.rename(columns={'codigoProduto': 'codigo'}, inplace=True)
-    df_estoque_update = df_estoque[['codigo', 'quantidadeEstoque']].copy()
-    
-    df_produtos['codigo'] = df_produtos['codigo'].astype(str)
-    df_estoque_update['codigo'] = df_estoque_update['codigo'].astype(str)
-    
-    # Usa o 'código' do produto como índice para uma atualização eficiente.
-    df_produtos.set_index('codigo', inplace=True)
-    df_estoque_update.set_index('codigo', inplace=True)
-    
-    # A função 'update' do pandas atualiza os valores em 'df_produtos' com base
-    # nos valores correspondentes (pelo índice) em 'df_estoque_update'.
-    df_produtos.update(df_estoque_update)
-    
-    df_produtos.reset_index(inplace=True) # Restaura o índice para o padrão.
-    
-    _escrever_para_db(df_produtos, NOME_TABELA, if_exists='replace')
+    # Quantidades nulas não alteram o estoque gravado (como no antigo 'DataFrame.update').
+    df_estoque_update = df_estoque[['codigo', 'quantidadeEstoque']].dropna(subset=['quantidadeEstoque'])
+    atualizacoes = list(zip(df_estoque_update['quantidadeEstoque'].tolist(), df_estoque_update['codigo'].tolist()))
+
+    try:
+        with engine.begin() as conn:
+            colunas_tabela = [linha[1] for linha in conn.exec_driver_sql(f'PRAGMA table_info("{NOME_TABELA}")')]
+            if not colunas_tabela or conn.exec_driver_sql(f'SELECT 1 FROM "{NOME_TABELA}" LIMIT 1').first() is None:
+                logging.warning("A tabela de produtos está vazia. Não é possível atualizar o estoque. Execute a carga de produtos primeiro.")
+                return
+            if 'quantidadeEstoque' not in colunas_tabela:
+                logging.warning("A tabela de produtos não tem a coluna 'quantidadeEstoque'. Nenhum estoque foi atualizado.")
+                return
+            # Atualiza só a coluna de estoque dos produtos alterados, localizados pelo índice de
+            # 'codigo', em vez de ler e regravar a tabela inteira. A comparação usa a afinidade da
+            # coluna, então casa o código gravado como número ou como texto.
+            _garantir_chave_unica(conn, NOME_TABELA, 'codigo')
+            conn.exec_driver_sql(f'UPDATE "{NOME_TABELA}" SET "quantidadeEstoque" = ? WHERE "codigo" = ?', atualizacoes)
+        logging.info(f"Sucesso: estoque de {len(atualizacoes)} produtos atualizado na tabela '{NOME_TABELA}'.")
+    except Exception as e:
+        logging.error(f"Falha ao atualizar o estoque na tabela '{NOME_TABELA}': {e}", exc_info=True)
+        raise
+    finally:
+        # Só a coluna de estoque muda: a versão é registrada à parte ('produtos_estoque'), para
+        # não invalidar o que depende apenas dos cadastros (o enriquecimento das vendas e a
+        # verificação de 'dados_analiticos_desatualizados' não usam o estoque).
+        _marcar_tabela_alterada('produtos_estoque')
+
+def sincronizar_produtos_e_estoque():
+    """
+    Faz em uma só passagem a sincronização dos produtos alterados e a do estoque, para
+    quando as duas vencem juntas: as duas buscas são feitas ao mesmo tempo e as gravações
+    na tabela 'produtos' uma depois da outra, com o estoque por último (como quando
+    'sincronizar_produtos' e 'sincronizar_estoque' rodavam em sequência).
+    """
+    logging.info("\nIniciando sincronização de produtos e estoque...")
+    hoje_str = datetime.now().strftime('%Y-%m-%d')
+    params = {"dataInicial": hoje_str, "dataFinal": hoje_str}
+    dados_alterados, dados_estoque = _buscar_em_paralelo((cfg.PRODUTO_ALT_ENDPOINT, params),
+                                                         (cfg.ESTOQUE_ALT_ENDPOINT, params))
+    # Cada gravação é feita mesmo que a outra falhe, como nas tarefas separadas (o erro já é
+    # registrado por ela); o primeiro erro é relançado no fim, para o orquestrador tratar a falha.
+    erros = []
+    for gravar, dados in ((_gravar_produtos_alterados, dados_alterados), (_gravar_estoque, dados_estoque)):
+        try:
+            gravar(dados)
+        except Exception as e:
+            erros.append(e)
+    if erros:
+        raise erros[0]
 
 def realizar_carga_historica_compras():
     """
@@ -657,29 +1261,17 @@ def realizar_carga_historica_compras():
     logging.info(f"\nIniciando carga completa das COMPRAS...")
 
     estado = _carregar_estado(NOME_TAREFA)
-    ultima_data_concluida_str = estado.get('ultima_data_concluida')
 
-    data_inicio_historico = pd.to_datetime(cfg.HISTORICAL_START_DATE)
-    data_inicio_loop = data_inicio_historico
-    if ultima_data_concluida_str:
-        data_inicio_loop = datetime.strptime(ultima_data_concluida_str, '%Y-%m-%d') + timedelta(days=cfg.SALES_FILE_DAYS_INTERVAL)
-
-    data_fim_loop = datetime.now()
-    data_atual_periodo = data_inicio_loop
-    
-    df_existente = _ler_do_db(NOME_TABELA)
+    def buscar_periodo(data_inicio_str, data_fim_str):
+        params_periodo = {"dataInicial": data_inicio_str, "dataFinal": data_fim_str}
+        return _buscar_dados_paginados(cfg.COMPRAS_ALT_ENDPOINT, params=params_periodo)
 
-    while data_atual_periodo <= data_fim_loop:
-        data_fim_periodo = data_atual_periodo + timedelta(days=cfg.SALES_FILE_DAYS_INTERVAL - 1)
-        if data_fim_periodo > data_fim_loop: data_fim_periodo = data_fim_loop
-        
-        data_inicio_str = data_atual_periodo.strftime('%Y-%m-%d')
-        data_fim_str = data_fim_periodo.strftime('%Y-%m-%d')
+    # Todos os períodos (já como texto) são gerados antes do loop; o seguinte é buscado
+    # enquanto o atual é gravado.
+    periodos = _periodos_da_carga(estado.get('ultima_data_concluida'))
+    for data_inicio_str, data_fim_str, dados_compras in _buscar_periodos_antecipando(periodos, buscar_periodo):
         logging.info(f"\nProcessando período de compras de {data_inicio_str} a {data_fim_str}")
         
-        params_periodo = {"dataInicial": data_inicio_str, "dataFinal": data_fim_str}
-        dados_compras = _buscar_dados_paginados(cfg.COMPRAS_ALT_ENDPOINT, params=params_periodo)
-        
         if dados_compras is None:
             logging.error("Falha ao buscar compras para o período. A tarefa será retomada na próxima execução.")
             return
@@ -688,17 +1280,15 @@ def realizar_carga_historica_compras():
             logging.info("Nenhuma compra encontrada para o período.")
         else:
             df_compras_periodo = pd.DataFrame(dados_compras)
+            del dados_compras  # Libera os registros brutos antes da gravação.
             try:
-                # Junta os dados novos com os já existentes e remove duplicatas pela chave da nota
-                df_final = pd.concat([df_existente, df_compras_periodo]).drop_duplicates(subset=['numeroNotaFiscal'], keep='last')
-                _escrever_para_db(df_final, NOME_TABELA, if_exists='replace')
-                df_existente = df_final.copy()
+                # Grava só as notas do período; versões anteriores da mesma nota são substituídas.
+                _upsert_para_db(df_compras_periodo, NOME_TABELA, 'numeroNotaFiscal')
             except Exception as e:
                 logging.error(f"Falha ao salvar o período de compras no banco de dados. Erro: {e}", exc_info=True)
                 return
         
-        _salvar_estado(NOME_TAREFA, {'ultima_data_concluida': data_atual_periodo.strftime('%Y-%m-%d')})
-        data_atual_periodo += timedelta(days=cfg.SALES_FILE_DAYS_INTERVAL)
+        _salvar_estado(NOME_TAREFA, {'ultima_data_concluida': data_inicio_str})
         
     logging.info(f"Tarefa '{NOME_TAREFA}' concluída com sucesso.")
     _limpar_estado(NOME_TAREFA)
@@ -712,9 +1302,6 @@ def atualizar_compras_recentes():
     NOME_TABELA = 'compras'
     logging.info("\nIniciando atualização de compras recentes...")
     
-    df_existente = _ler_do_db(NOME_TABELA)
-    logging.info(f"Encontrados {len(df_existente)} registros existentes na tabela '{NOME_TABELA}'.")
-    
     hoje_str = datetime.now().strftime('%Y-%m-%d')
     params_alt = {"dataInicial": hoje_str, "dataFinal": hoje_str}
     dados_alterados = _buscar_dados_paginados(cfg.COMPRAS_ALT_ENDPOINT, params=params_alt)
@@ -726,14 +1313,9 @@ def atualizar_compras_recentes():
     df_alterados = pd.DataFrame(dados_alterados)
     logging.info(f"{len(df_alterados)} compras novas/alteradas encontradas.")
 
-    # Lógica de atualização: remove as versões antigas das notas que foram alteradas
-    # e depois adiciona as novas versões.
-    ids_para_remover = df_alterados['numeroNotaFiscal'].unique()
-    df_intermediario = df_existente[~df_existente['numeroNotaFiscal'].isin(ids_para_remover)]
-    
-    # Junta o DataFrame original (sem as notas alteradas) com as novas versões.
-    df_final = pd.concat([df_intermediario, df_alterados]).drop_duplicates(subset=['numeroNotaFiscal'], keep='last')
-    _escrever_para_db(df_final, NOME_TABELA, if_exists='replace')
+    # Lógica de atualização: as novas versões das notas alteradas substituem as antigas,
+    # gravando só estas linhas.
+    _upsert_para_db(df_alterados, NOME_TABELA, 'numeroNotaFiscal')
 
 def sincronizar_fornecedores_carga_inicial():
     """
@@ -783,11 +1365,7 @@ def atualizar_fornecedores_recentes():
     df_alterados = pd.DataFrame(dados_alterados)
     logging.info(f"{len(df_alterados)} fornecedores novos/alterados encontrados.")
 
-    df_existente = _ler_do_db(NOME_TABELA)
-    
-    # Lógica de atualização: junta os fornecedores existentes com os alterados,
-    # mantendo a versão mais recente em caso de duplicatas (baseado no código).
+    # Lógica de atualização: grava só os fornecedores alterados, substituindo a versão
+    # existente de cada um (baseado no código).
     # Assumimos que 'codigo' é o identificador único do fornecedor.
-    df_final = pd.concat([df_existente, df_alterados]).drop_duplicates(subset=['codigo'], keep='last')
-    
-    _escrever_para_db(df_final, NOME_TABELA, if_exists='replace')
\ No newline at end of file
+    _upsert_para_db(df_alterados, NOME_TABELA, 'codigo')
\ No newline at end of file
@@ -0,0 +1,24 @@
+# -*- coding: utf-8 -*-
+
+# ==============================================================================
+# CONFIGURAÇÃO DO GUNICORN (SERVIDOR WSGI PARA LINUX)
+# ==============================================================================
+# Uso: gunicorn -c gunicorn.conf.py wsgi:app
+
+bind = '0.0.0.0:5000'     # Mesmo endereço e porta do servidor de desenvolvimento.
+workers = 4               # Processos atendendo requisições em paralelo.
+worker_class = 'gthread'  # Cada processo atende várias requisições com threads.
+threads = 4               # Threads por processo.
+preload_app = True        # Carrega o app (e os caches, ver wsgi.py) uma vez antes de criar os workers.
+timeout = 120             # A primeira carga dos caches pode demorar em bancos grandes.
+
+
+def post_fork(server, worker):
+    """
+    Executado em cada worker logo após ser criado a partir do processo principal.
+    """
+    from app import engine
+
+    # As conexões SQLite abertas pelo processo principal (durante o preload) não podem
+    # ser usadas por outro processo: o worker descarta as herdadas e abre as suas.
+    engine.dispose(close=False)
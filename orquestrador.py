@@ -2,11 +2,19 @@
 # IMPORTAÇÃO DE BIBLIOTECAS
 # ==============================================================================
 # Módulos padrão do Python para funcionalidades essenciais.
-import time  # Usado para pausar a execução do loop principal (time.sleep).
+import time  # Usado para pausar a execução do loop principal (time.sleep) e medir o tempo (time.monotonic).
+import sched  # Agenda de eventos com os próximos horários de execução das tarefas.
 import os    # Para interagir com o sistema operacional, como verificar a existência de arquivos (os.path.exists).
 from datetime import datetime, timedelta  # Para manipular datas e horas, usado para agendar as próximas execuções.
 import logging  # Para registrar informações, avisos e erros em um arquivo de log e no console.
-import sqlite3  # Para interagir diretamente com o banco de dados SQLite na verificação inicial.
+import logging.handlers  # Rotação do arquivo de log e envio dos registros por uma fila.
+import queue  # Fila entre as tarefas que registram logs e a thread que os escreve.
+import atexit  # Para esvaziar a fila de logs ao encerrar o processo.
+import signal  # Para tratar os pedidos de encerramento (CTRL+C e SIGTERM).
+import threading  # Evento que sinaliza o pedido de encerramento à agenda.
+import random  # Variação aleatória no adiamento das tarefas depois de falhas.
+from concurrent.futures import ThreadPoolExecutor  # Para executar ao mesmo tempo as cargas e tarefas independentes.
+from functools import partial  # Para fixar o contexto da mensagem de erro no callback de cada tarefa.
 
 # ==============================================================================
 # IMPORTAÇÃO DE MÓDULOS DO PROJETO
@@ -33,26 +41,59 @@ if logger.hasHandlers():
     logger.handlers.clear()
 
 # Cria um handler para escrever os logs em um arquivo chamado 'log.txt' no modo 'append' (adicionar ao final).
-file_handler = logging.FileHandler('log.txt', mode='a')
+# Ao chegar a 10 MB, o arquivo é renomeado para 'log.txt.1' (e assim por diante, até 'log.txt.5',
+# descartando o mais antigo) e um novo 'log.txt' é iniciado: o log não cresce sem limite.
+file_handler = logging.handlers.RotatingFileHandler('log.txt', mode='a', maxBytes=10 * 1024 * 1024, backupCount=5)
 file_handler.setFormatter(formatter)  # Aplica o formato definido ao handler de arquivo.
 
 # Cria um handler para exibir os logs no console (saída padrão).
 stream_handler = logging.StreamHandler()
 stream_handler.setFormatter(formatter) # Aplica o mesmo formato ao handler de console.
 
-# Adiciona os dois handlers (arquivo e console) ao logger principal.
-logger.addHandler(file_handler)
-logger.addHandler(stream_handler)
+# O logger principal só coloca cada registro em uma fila (operação rápida, sem acesso a disco);
+# uma thread à parte ('QueueListener') os retira e escreve nos dois handlers (arquivo e console).
+# Assim as tarefas não esperam pela escrita do log.
+fila_logs = queue.Queue(-1)
+logger.addHandler(logging.handlers.QueueHandler(fila_logs))
+ouvinte_logs = logging.handlers.QueueListener(fila_logs, file_handler, stream_handler, respect_handler_level=True)
+ouvinte_logs.start()
+# Ao encerrar, escreve os registros que ainda estiverem na fila e para a thread.
+atexit.register(ouvinte_logs.stop)
 
 
 # ==============================================================================
 # FUNÇÕES AUXILIARES
 # ==============================================================================
+# Arquivo-marcador criado (vazio) ao lado do banco quando as tabelas essenciais já existem:
+# nos inícios seguintes basta conferir que ele existe, sem abrir o banco para consultar.
+ARQUIVO_CARGA_INICIAL_CONCLUIDA = f"{cfg.DATABASE_FILE}.bootstrapped"
+
+def _marcar_carga_inicial_concluida():
+    """
+    Cria o arquivo-marcador da carga inicial (uma única vez; se ele já existir, nada muda).
+    """
+    try:
+        # O_EXCL: a criação é atômica e falha se outro processo já tiver criado o marcador.
+        os.close(os.open(ARQUIVO_CARGA_INICIAL_CONCLUIDA, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+    except FileExistsError:
+        pass
+    except OSError as e:
+        # Sem o marcador, a verificação só volta a consultar o banco no próximo início.
+        logging.warning(f"Não foi possível criar o marcador da carga inicial: {e}")
+
+# Tabelas essenciais para a aplicação (nomes distintos: a contagem abaixo só chega ao total se todas existirem).
+TABELAS_ESSENCIAIS = ('vendas', 'produtos', 'vendedores', 'compras', 'fornecedores')
+# Consulta que verifica a existência de todas as tabelas de uma vez: o próprio SQLite conta
+# quantas delas existem e devolve um único número. Montada uma vez, na importação do módulo.
+SQL_CONTAGEM_TABELAS_ESSENCIAIS = ("SELECT COUNT(*) FROM sqlite_master WHERE type='table' AND name IN ("
+                                   + ', '.join('?' * len(TABELAS_ESSENCIAIS)) + ")")
+
 def _tabelas_iniciais_existem():
     """
     Verifica se o arquivo de banco de dados e as tabelas essenciais
     ('vendas', 'produtos', 'vendedores', 'compras', 'fornecedores') já existem.
     Isso é crucial para determinar se a carga inicial de dados deve ser executada.
+    Depois da primeira confirmação, o arquivo-marcador dispensa a consulta ao banco.
 
     Retorna:
         bool: True se o banco e as tabelas existirem, False caso contrário.
@@ -60,34 +101,248 @@ def _tabelas_iniciais_existem():
     # Se o arquivo do banco de dados não existir, não há necessidade de continuar a verificação.
     if not os.path.exists(cfg.DATABASE_FILE):
         return False
+
+    # Banco existente e marcador presente: as tabelas já foram confirmadas em um início anterior.
+    if os.path.exists(ARQUIVO_CARGA_INICIAL_CONCLUIDA):
+        return True
         
     try:
-        # Conecta-se ao banco de dados SQLite.
-        conn = sqlite3.connect(cfg.DATABASE_FILE)
-        cursor = conn.cursor()
-        
-        # Lista de tabelas essenciais para a aplicação.
-        tabelas_essenciais = ['vendas', 'produtos', 'vendedores', 'compras', 'fornecedores']
-        
-        # Constrói a consulta para verificar a existência de todas as tabelas de uma vez.
-        placeholders = ', '.join('?' for _ in tabelas_essenciais)
-        query = f"SELECT name FROM sqlite_master WHERE type='table' AND name IN ({placeholders})"
-        cursor.execute(query, tabelas_essenciais)
-        
-        # Extrai os nomes das tabelas encontradas do resultado da consulta.
-        tabelas_encontradas = {row[0] for row in cursor.fetchall()}
-        
-        # Fecha a conexão com o banco de dados.
-        conn.close()
+        # Usa uma conexão do pool do módulo da API (já configurada com WAL, cache e tempo de
+        # espera por bloqueios): ao ser devolvida ao pool, ela fica aberta e é reaproveitada
+        # pelas cargas e atualizações seguintes, em vez de abrir e fechar o arquivo só para isto.
+        with api.engine.connect() as conn:
+            quantidade_encontrada = conn.exec_driver_sql(SQL_CONTAGEM_TABELAS_ESSENCIAIS, TABELAS_ESSENCIAIS).scalar()
         
-        # Retorna True somente se o conjunto de tabelas encontradas for igual ao conjunto de tabelas essenciais.
-        return set(tabelas_essenciais) == tabelas_encontradas
+        # Retorna True somente se todas as tabelas essenciais existirem (os nomes no sqlite_master são únicos).
+        tabelas_existem = quantidade_encontrada == len(TABELAS_ESSENCIAIS)
+        if tabelas_existem:
+            _marcar_carga_inicial_concluida()
+        return tabelas_existem
         
     except Exception as e:
         # Em caso de qualquer erro durante a verificação, registra o problema e retorna False.
         logging.error(f"Erro ao verificar tabelas no banco de dados: {e}")
         return False
 
+def _executar_em_paralelo(tarefas):
+    """
+    Executa ao mesmo tempo tarefas independentes (endpoints e tabelas diferentes), para que
+    as esperas pela API de uma não atrasem as outras. Um erro em uma tarefa é registrado e
+    não impede as demais de rodar.
+
+    Parâmetros:
+        tarefas (list): Pares (descrição usada na mensagem de erro, função sem argumentos).
+    """
+    with ThreadPoolExecutor(max_workers=len(tarefas)) as executor:
+        futuros = [(descricao, executor.submit(funcao)) for descricao, funcao in tarefas]
+        for descricao, futuro in futuros:
+            try:
+                futuro.result()
+            except Exception as e:
+                logging.error(f"Erro inesperado durante {descricao}: {e}", exc_info=True)
+
+def _carga_historica_vendas():
+    """
+    Realiza a carga completa de todo o histórico de vendas e, em seguida, processa os
+    dados brutos e salva na tabela 'vendas_processadas'.
+    """
+    api.realizar_carga_historica_vendas()
+    api.processar_e_salvar_dados_analiticos()
+
+# Intervalo mínimo (em minutos) entre dois reprocessamentos da tabela analítica. Opcional no
+# config_conexao ('INTERVALO_ANALISE'); 0 reprocessa em todo ciclo de vendas que tiver alterações.
+INTERVALO_MINIMO_ANALISE_S = getattr(cfg, 'INTERVALO_ANALISE', 0) * 60
+
+# Horário (monotônico) do último reprocessamento feito pelo ciclo de vendas.
+_ultimo_processamento_analitico = None
+
+def _ciclo_vendas():
+    """
+    Busca apenas as vendas recentes (alteradas/novas/canceladas), atualiza o banco e
+    reprocessa as notas alteradas para manter a tabela analítica atualizada (ou todos os
+    dados, se os cadastros mudaram). O reprocessamento só acontece se vendas, produtos ou
+    vendedores mudaram desde o anterior, e no máximo uma vez a cada INTERVALO_MINIMO_ANALISE_S
+    (as alterações adiadas ficam para o próximo ciclo). Uma falha no reprocessamento é
+    lançada como erro, para o ciclo contar como falho (ver _registrar_fim_da_tarefa).
+    """
+    global _ultimo_processamento_analitico
+    api.atualizar_vendas_recentes()
+
+    if not api.dados_analiticos_desatualizados():
+        logging.info("Nenhuma alteração nos dados desde o último processamento. Reprocessamento dispensado.")
+        return
+    agora = time.monotonic()
+    if _ultimo_processamento_analitico is not None and agora - _ultimo_processamento_analitico < INTERVALO_MINIMO_ANALISE_S:
+        logging.info("Reprocessamento adiado para o próximo ciclo de vendas (intervalo mínimo entre reprocessamentos).")
+        return
+    if not api.processar_e_salvar_dados_analiticos_incremental():
+        raise RuntimeError("Falha no reprocessamento da tabela analítica (ver o erro registrado acima).")
+    _ultimo_processamento_analitico = agora
+
+def _manutencao_banco():
+    """
+    Manutenção periódica do banco de dados: 'PRAGMA optimize' atualiza as estatísticas que o
+    SQLite usa para planejar as consultas, só das tabelas que mudaram bastante (sem alterações,
+    não faz nada), e o checkpoint PASSIVE transfere o conteúdo do WAL para o arquivo do banco
+    sem esperar pelas conexões em uso. Antes, confere, nota a nota, a tabela analítica mantida
+    pelas atualizações incrementais contra a tabela 'vendas'.
+    """
+    try:
+        api.conferir_vendas_processadas()
+    except Exception as e:
+        # Uma falha na conferência não impede o restante da manutenção.
+        logging.error(f"Erro na conferência da tabela 'vendas_processadas': {e}", exc_info=True)
+    with api.engine.connect() as conn:
+        conn.exec_driver_sql('PRAGMA optimize')
+        _, paginas_wal, paginas_transferidas = conn.exec_driver_sql('PRAGMA wal_checkpoint(PASSIVE)').first()
+    logging.info(f"Manutenção do banco concluída ({paginas_transferidas} de {paginas_wal} páginas do WAL transferidas).")
+
+# Depois de falhas seguidas, a espera até a próxima execução de uma tarefa dobra a cada falha
+# (2x, 4x, 8x... o intervalo), limitada a ESPERA_MAXIMA_APOS_FALHAS_S (ou ao próprio intervalo,
+# se ele for maior). Assim a API não é pressionada justamente quando está com problemas.
+ESPERA_MAXIMA_APOS_FALHAS_S = 30 * 60
+
+def _registrar_fim_da_tarefa(contexto_erro, tarefas, futuro):
+    """
+    Chamada quando uma execução agendada termina: registra o erro que ela tiver lançado, como
+    o 'try/except' em volta de cada tarefa fazia quando elas rodavam em sequência, e adia a
+    próxima execução depois de falhas seguidas. Um sucesso zera a contagem de falhas.
+
+    Parâmetros:
+        contexto_erro (str): Onde o erro ocorreu, para a mensagem (ex: 'no ciclo de vendas').
+        tarefas (list): Uma tupla (nome, intervalo em segundos, situação) para cada tarefa
+                        desta execução (duas quando uma combinação roda junta). A situação é
+                        o dicionário da tarefa na agenda ('falhas_seguidas' e 'liberada_em',
+                        o horário monotônico antes do qual ela não volta a rodar).
+        futuro (Future): O futuro da execução que terminou.
+    """
+    if futuro.cancelled():
+        return
+    erro = futuro.exception()
+    if erro is None:
+        for _, _, situacao in tarefas:
+            situacao['falhas_seguidas'] = 0
+        return
+    logging.error(f"Erro inesperado {contexto_erro}: {erro}", exc_info=erro)
+
+    for nome, intervalo_s, situacao in tarefas:
+        situacao['falhas_seguidas'] += 1
+        espera_s = min(intervalo_s * 2 ** situacao['falhas_seguidas'], max(intervalo_s, ESPERA_MAXIMA_APOS_FALHAS_S))
+        # Variação aleatória de até 10%: depois de uma queda geral, as tarefas não voltam todas juntas.
+        espera_s += random.uniform(0, espera_s * 0.1)
+        situacao['liberada_em'] = time.monotonic() + espera_s
+        logging.warning(f"{situacao['falhas_seguidas']} falha(s) seguida(s) {contexto_erro}. "
+                        f"Próxima tentativa de {nome} em {espera_s / 60:.1f} minutos.")
+
+# Sinalizado quando o encerramento do orquestrador é pedido (CTRL+C ou SIGTERM).
+_parada_solicitada = threading.Event()
+# Número do sinal que pediu o encerramento (para a mensagem final).
+_sinal_de_parada = None
+
+class _EncerramentoSolicitado(Exception):
+    """
+    Interrompe a agenda de tarefas quando o encerramento do orquestrador é pedido.
+    """
+
+def _solicitar_parada(numero_sinal, _quadro):
+    """
+    Handler de SIGINT/SIGTERM: só registra o pedido de encerramento. A agenda o percebe na
+    hora (veja '_esperar') e as tarefas em execução terminam antes da saída. Não usa o
+    logging, que pode estar no meio de uma escrita na thread interrompida.
+    """
+    global _sinal_de_parada
+    _sinal_de_parada = numero_sinal
+    _parada_solicitada.set()
+
+def _esperar(segundos):
+    """
+    Espera usada pela agenda até a próxima tarefa vencer. Acorda imediatamente se o
+    encerramento for pedido, interrompendo a agenda.
+
+    Parâmetros:
+        segundos (float): Tempo até a próxima tarefa.
+    """
+    if _parada_solicitada.wait(segundos):
+        raise _EncerramentoSolicitado
+
+# Número máximo de tarefas agendadas rodando ao mesmo tempo.
+TAREFAS_SIMULTANEAS = 4
+
+# Tarefas do ciclo de atualização contínua, na ordem em que rodam quando vencem juntas.
+# Cada uma: (nome no agendamento, título no log, contexto da mensagem de erro,
+#            constante do config_conexao com o intervalo em minutos, função a executar).
+TAREFAS_AGENDADAS = [
+    # 1. Vendas (seguidas do reprocessamento da tabela analítica).
+    ("vendas", "Atualização de VENDAS", "no ciclo de vendas", "INTERVALO_VENDAS", _ciclo_vendas),
+    # 2. Produtos: sincroniza apenas os produtos alterados no dia.
+    ("produtos", "'sincronizar_produtos'", "em 'sincronizar_produtos'", "INTERVALO_PRODUTOS",
+     lambda: api.sincronizar_produtos(carga_inicial=False)),
+    # 3. Estoque: busca e atualiza o estoque dos produtos que tiveram movimentação.
+    ("estoque", "'sincronizar_estoque'", "em 'sincronizar_estoque'", "INTERVALO_ESTOQUE", api.sincronizar_estoque),
+    # 4. Vendedores: sincroniza a lista completa (executa com menos frequência).
+    ("vendedores", "'sincronizar_vendedores'", "em 'sincronizar_vendedores'", "INTERVALO_VENDEDORES", api.sincronizar_vendedores),
+    # 5. Compras: busca apenas as compras recentes (alteradas/novas).
+    ("compras", "Atualização de COMPRAS", "no ciclo de compras", "INTERVALO_COMPRAS", api.atualizar_compras_recentes),
+    # 6. Fornecedores: busca apenas os fornecedores recentes (alterados/novos).
+    ("fornecedores", "Atualização de FORNECEDORES", "no ciclo de fornecedores", "INTERVALO_FORNECEDORES", api.atualizar_fornecedores_recentes),
+    # 7. Manutenção: mantém as estatísticas do banco em dia e esvazia o WAL (a cada poucas horas).
+    ("manutencao", "Manutenção do BANCO", "na manutenção do banco", "INTERVALO_MANUTENCAO", _manutencao_banco),
+]
+
+# Intervalos (em minutos) opcionais no config_conexao, com o valor usado quando ausentes.
+INTERVALOS_PADRAO = {'INTERVALO_MANUTENCAO': 360}
+
+# Tarefas que rodam como uma só quando vencem juntas: (nome da primeira, nome da segunda, título,
+# contexto do erro, função). Produtos e estoque gravam a mesma tabela: juntas, as duas buscas são
+# feitas ao mesmo tempo e o estoque é gravado por último, como quando as tarefas rodavam em sequência.
+TAREFAS_COMBINADAS = [
+    ("produtos", "estoque", "'sincronizar_produtos_e_estoque'", "em 'sincronizar_produtos_e_estoque'", api.sincronizar_produtos_e_estoque),
+]
+# Folga para considerar que duas tarefas vencem juntas (cada uma é reagendada em um instante
+# ligeiramente diferente, então os horários raramente coincidem exatamente).
+FOLGA_TAREFAS_JUNTAS_S = 1.0
+
+def _intervalo_invalido(minutos, permitir_zero=False) -> bool:
+    """
+    Indica se um intervalo do config_conexao (em minutos) não é um número utilizável.
+
+    Parâmetros:
+        minutos: O valor configurado.
+        permitir_zero (bool): Se zero é aceito (intervalos opcionais, em que 0 desliga o limite).
+
+    Retorna:
+        bool: True se o valor não for um número (int/float, fora bool), for NaN/infinito ou
+              for negativo (ou zero, se não permitido).
+    """
+    if isinstance(minutos, bool) or not isinstance(minutos, (int, float)):
+        return True
+    # 'not (...)' também recusa NaN, que falha em qualquer comparação.
+    return not (0 <= minutos < float('inf')) or (minutos == 0 and not permitir_zero)
+
+def _intervalos_agendados_em_segundos():
+    """
+    Lê do config_conexao o intervalo de cada tarefa agendada e o converte (uma única vez) de
+    minutos para segundos. Um intervalo zero ou inválido faria a tarefa ser disparada sem
+    pausa, então cada valor é conferido antes de o orquestrador começar.
+
+    Retorna:
+        list | None: Os intervalos em segundos, na ordem de TAREFAS_AGENDADAS, ou None se algum
+                     estiver ausente ou inválido (cada problema é registrado no log).
+    """
+    intervalos_s = []
+    for _, _, _, nome_intervalo, _ in TAREFAS_AGENDADAS:
+        minutos = getattr(cfg, nome_intervalo, INTERVALOS_PADRAO.get(nome_intervalo))
+        if _intervalo_invalido(minutos):
+            logging.error(f"Configuração inválida: {nome_intervalo} = {minutos!r}. Informe um número de minutos maior que zero no config_conexao.py.")
+            intervalos_s = None
+        elif intervalos_s is not None:
+            intervalos_s.append(minutos * 60)
+    minutos_analise = getattr(cfg, 'INTERVALO_ANALISE', 0)
+    if _intervalo_invalido(minutos_analise, permitir_zero=True):
+        logging.error(f"Configuração inválida: INTERVALO_ANALISE = {minutos_analise!r}. Informe um número de minutos (0 ou mais) no config_conexao.py.")
+        intervalos_s = None
+    return intervalos_s
+
 # ==============================================================================
 # FUNÇÃO PRINCIPAL (ORQUESTRADOR)
 # ==============================================================================
@@ -104,6 +359,13 @@ def main():
     logging.info("=============================================")
     logging.info(f"Usando banco de dados em: {cfg.DATABASE_FILE}")
 
+    # Os intervalos são conferidos antes de qualquer carga, para não descobrir um erro de
+    # configuração só depois de uma carga inicial demorada.
+    intervalos_s = _intervalos_agendados_em_segundos()
+    if intervalos_s is None:
+        logging.error("Orquestrador não iniciado: corrija os intervalos no config_conexao.py.")
+        return
+
     # --- FASE DE INICIALIZAÇÃO ---
     logging.info("\n[FASE DE INICIALIZAÇÃO]")
     logging.info("Verificando se a carga de dados inicial é necessária...")
@@ -113,40 +375,28 @@ def main():
         logging.info("Banco de dados ou tabelas essenciais não encontrados. Executando rotinas de carga inicial...")
         
         # Bloco de carga inicial: executa as funções de sincronização pela primeira vez.
-        # Cada chamada é envolvida por um try-except para evitar que um erro em uma tarefa impeça as outras de rodar.
-        try:
-            # Sincroniza todos os produtos da API para a tabela 'produtos'.
-            api.sincronizar_produtos(carga_inicial=True)
-        except Exception as e:
-            logging.error(f"Erro inesperado durante a sincronização de produtos: {e}", exc_info=True)
-        
-        try:
-            # Sincroniza todos os vendedores da API para a tabela 'vendedores'.
-            api.sincronizar_vendedores()
-        except Exception as e:
-            logging.error(f"Erro inesperado durante a sincronização de vendedores: {e}", exc_info=True)
+        # Cada tarefa é protegida para evitar que um erro em uma delas impeça as outras de rodar.
+        # Primeiro os cadastros (produtos, vendedores e fornecedores), ao mesmo tempo: são
+        # independentes entre si, e o processamento das vendas depende dos dois primeiros.
+        _executar_em_paralelo([
+            ("a sincronização de produtos", lambda: api.sincronizar_produtos(carga_inicial=True)),
+            ("a sincronização de vendedores", api.sincronizar_vendedores),
+            ("a carga inicial de fornecedores", api.sincronizar_fornecedores_carga_inicial),
+        ])
 
-        try:
-            # (NOVO) Realiza a carga inicial de fornecedores.
-            api.sincronizar_fornecedores_carga_inicial()
-        except Exception as e:
-            logging.error(f"Erro inesperado durante a carga inicial de fornecedores: {e}", exc_info=True)
-            
-        try:
-            # Realiza a carga completa de todo o histórico de vendas.
-            api.realizar_carga_historica_vendas()
-            # Após a carga, processa os dados brutos e salva na tabela 'vendas_processadas'.
-            api.processar_e_salvar_dados_analiticos()
-        except Exception as e:
-            logging.error(f"Erro inesperado durante a carga histórica de vendas: {e}", exc_info=True)
+        # Depois as cargas históricas de vendas (seguida do processamento para a tabela
+        # 'vendas_processadas') e de compras, também ao mesmo tempo.
+        _executar_em_paralelo([
+            ("a carga histórica de vendas", _carga_historica_vendas),
+            ("a carga histórica de compras", api.realizar_carga_historica_compras),
+        ])
 
-        try:
-            # Realiza a carga completa de todo o histórico de compras.
-            api.realizar_carga_historica_compras()
-        except Exception as e:
-            logging.error(f"Erro inesperado durante a carga histórica de compras: {e}", exc_info=True)
-
-        logging.info("Carga inicial e processamento de todos os dados foram concluídos.")
+        # Confere o resultado da carga: se as tabelas essenciais foram criadas, o marcador é gravado
+        # agora; senão a carga inicial é retomada (pelos checkpoints) no próximo início.
+        if _tabelas_iniciais_existem():
+            logging.info("Carga inicial e processamento de todos os dados foram concluídos.")
+        else:
+            logging.warning("Carga inicial concluída com falhas: nem todas as tabelas essenciais foram criadas. Ela será retomada no próximo início.")
 
     else:
         # Se as tabelas já existem, informa que a carga inicial será pulada.
@@ -156,112 +406,112 @@ def main():
     logging.info("\n[FASE DE ORQUESTRAÇÃO]")
     logging.info("Entrando no ciclo de atualização contínua. Pressione CTRL+C para sair.")
     
-    # Inicializa as variáveis de agendamento com a hora atual para garantir
-    # que todas as tarefas sejam executadas na primeira iteração do loop.
-    agora = datetime.now()
-    proxima_exec_vendas = agora
-    proxima_exec_compras = agora
-    proxima_exec_produtos = agora
-    proxima_exec_estoque = agora
-    proxima_exec_vendedores = agora
-    proxima_exec_fornecedores = agora # (NOVO)
+    # A partir daqui, CTRL+C (SIGINT) e SIGTERM (ex: 'systemctl stop') apenas pedem o encerramento:
+    # a agenda para de disparar tarefas e as que estiverem rodando terminam antes da saída.
+    signal.signal(signal.SIGINT, _solicitar_parada)
+    signal.signal(signal.SIGTERM, _solicitar_parada)
+
+    # Agenda do módulo 'sched' (biblioteca padrão): mantém os eventos ordenados por horário e dorme
+    # exatamente até o próximo vencer, em vez de acordar a cada minuto para conferir. Os horários vêm
+    # do relógio monotônico, que não é afetado por ajustes no relógio do sistema.
+    agenda = sched.scheduler(time.monotonic, _esperar)
+
+    # As tarefas rodam em um pool de threads (são quase só esperas pela API e pelo banco), para
+    # que uma tarefa demorada não atrase as que vencerem enquanto isso. 'em_execucao' guarda o
+    # futuro da última execução de cada tarefa: a mesma tarefa nunca roda duas vezes ao mesmo tempo.
+    executor = ThreadPoolExecutor(max_workers=TAREFAS_SIMULTANEAS)
+    em_execucao = {}
+    # Falhas seguidas de cada tarefa e até quando ela fica em espera por causa delas.
+    situacoes = [{'falhas_seguidas': 0, 'liberada_em': 0.0} for _ in TAREFAS_AGENDADAS]
+    # Próximo evento da agenda de cada tarefa (para adiantar a segunda tarefa de uma combinação).
+    eventos = {}
+    # Para a primeira tarefa de cada combinação: (índice da segunda, título, contexto do erro, função).
+    indices = {tarefa[0]: indice for indice, tarefa in enumerate(TAREFAS_AGENDADAS)}
+    combinacoes = {indices[primeira]: (indices[segunda], titulo, contexto_erro, funcao)
+                   for primeira, segunda, titulo, contexto_erro, funcao in TAREFAS_COMBINADAS
+                   if primeira in indices and segunda in indices}
+
+    def reagendar(indice):
+        # Reagenda a próxima execução da tarefa, contada a partir de agora (início desta execução).
+        # A prioridade (posição na lista) desempata as tarefas que vencem no mesmo instante.
+        eventos[indice] = agenda.enter(intervalos_s[indice], indice, executar_tarefa, (indice,))
+        proxima_exec = datetime.now() + timedelta(seconds=intervalos_s[indice])
+        logging.info(f"AGENDADO: Próxima execução de {TAREFAS_AGENDADAS[indice][0]} para {proxima_exec.strftime('%H:%M:%S')}")
+
+    def livre(indice, agora):
+        # A tarefa não está em espera por falhas nem com a execução anterior ainda rodando.
+        execucao_anterior = em_execucao.get(indice)
+        return situacoes[indice]['liberada_em'] <= agora and (execucao_anterior is None or execucao_anterior.done())
+
+    def executar_tarefa(indice):
+        # Evento da agenda: dispara a tarefa vencida no pool e a reagenda.
+        _, titulo, contexto_erro, _, funcao = TAREFAS_AGENDADAS[indice]
+        agora = time.monotonic()
+        adiamento_s = situacoes[indice]['liberada_em'] - agora
+        if adiamento_s > 0:
+            # Tarefa em espera depois de falhas seguidas: volta para a agenda no fim da espera.
+            eventos[indice] = agenda.enter(adiamento_s, indice, executar_tarefa, (indice,))
+            return
+        execucao_anterior = em_execucao.get(indice)
+        if execucao_anterior is not None and not execucao_anterior.done():
+            # A execução anterior ainda não terminou: esta é pulada e a tarefa segue no agendamento.
+            logging.warning(f"PULADO: {titulo} ainda está em execução desde o agendamento anterior.")
+            reagendar(indice)
+            return
+
+        # Se a segunda tarefa da combinação também venceu (e está livre), as duas rodam juntas:
+        # o evento dela sai da agenda e ela é reagendada a partir desta execução.
+        combinacao = combinacoes.get(indice)
+        segunda = None
+        if combinacao is not None and eventos[combinacao[0]].time <= agora + FOLGA_TAREFAS_JUNTAS_S and livre(combinacao[0], agora):
+            segunda, titulo, contexto_erro, funcao = combinacao
+            agenda.cancel(eventos[segunda])
+
+        # Sem cabeçalho com a hora: o formato do log já carimba cada registro.
+        logging.info(f"EXECUTANDO: {titulo}")
+        futuro = executor.submit(funcao)
+        # Ao terminar, um erro da tarefa é registrado no log (sem derrubar o orquestrador) e a
+        # espera depois de falhas vale para todas as tarefas que rodaram nesta execução.
+        executadas = [indice] if segunda is None else [indice, segunda]
+        futuro.add_done_callback(partial(_registrar_fim_da_tarefa, contexto_erro,
+                                         [(TAREFAS_AGENDADAS[i][0], intervalos_s[i], situacoes[i]) for i in executadas]))
+        em_execucao[indice] = futuro
+        reagendar(indice)
+        if segunda is not None:
+            em_execucao[segunda] = futuro
+            reagendar(segunda)
+
+    # Todas as tarefas começam vencidas, para rodarem na primeira volta (na ordem da lista).
+    for indice in range(len(TAREFAS_AGENDADAS)):
+        eventos[indice] = agenda.enter(0, indice, executar_tarefa, (indice,))
     
     try:
-        # Loop infinito que mantém o orquestrador rodando.
-        while True:
-            agora = datetime.now()
-            
-            # --- VERIFICAÇÃO E EXECUÇÃO DE TAREFAS AGENDADAS ---
-
-            # 1. Tarefa de Vendas
-            if agora >= proxima_exec_vendas:
-                logging.info(f"\n--- {agora.strftime('%Y-%m-%d %H:%M:%S')} ---")
-                logging.info("EXECUTANDO: Atualização de VENDAS")
-                try:
-                    # Busca apenas as vendas recentes (alteradas/novas/canceladas) e atualiza o banco.
-                    api.atualizar_vendas_recentes()
-                    # Reprocessa todos os dados para manter a tabela analítica atualizada.
-                    api.processar_e_salvar_dados_analiticos()
-                except Exception as e:
-                    logging.error(f"Erro inesperado no ciclo de vendas: {e}", exc_info=True)
-                # Reagenda a próxima execução desta tarefa.
-                proxima_exec_vendas = agora + timedelta(minutes=cfg.INTERVALO_VENDAS)
-                logging.info(f"AGENDADO: Próxima execução de vendas para {proxima_exec_vendas.strftime('%H:%M:%S')}")
-
-            # 2. Tarefa de Produtos
-            if agora >= proxima_exec_produtos:
-                logging.info(f"\n--- {agora.strftime('%Y-%m-%d %H:%M:%S')} ---")
-                logging.info("EXECUTANDO: 'sincronizar_produtos'")
-                try:
-                    # Sincroniza apenas os produtos alterados no dia.
-                    api.sincronizar_produtos(carga_inicial=False)
-                except Exception as e:
-                    logging.error(f"Erro inesperado em 'sincronizar_produtos': {e}", exc_info=True)
-                # Reagenda a próxima execução.
-                proxima_exec_produtos = agora + timedelta(minutes=cfg.INTERVALO_PRODUTOS)
-                logging.info(f"AGENDADO: Próxima execução de produtos para {proxima_exec_produtos.strftime('%H:%M:%S')}")
-
-            # 3. Tarefa de Estoque
-            if agora >= proxima_exec_estoque:
-                logging.info(f"\n--- {agora.strftime('%Y-%m-%d %H:%M:%S')} ---")
-                logging.info("EXECUTANDO: 'sincronizar_estoque'")
-                try:
-                    # Busca e atualiza o estoque dos produtos que tiveram movimentação.
-                    api.sincronizar_estoque()
-                except Exception as e:
-                    logging.error(f"Erro inesperado em 'sincronizar_estoque': {e}", exc_info=True)
-                # Reagenda a próxima execução.
-                proxima_exec_estoque = agora + timedelta(minutes=cfg.INTERVALO_ESTOQUE)
-                logging.info(f"AGENDADO: Próxima execução de estoque para {proxima_exec_estoque.strftime('%H:%M:%S')}")
-
-            # 4. Tarefa de Vendedores (executa com menos frequência)
-            if agora >= proxima_exec_vendedores:
-                logging.info(f"\n--- {agora.strftime('%Y-%m-%d %H:%M:%S')} ---")
-                logging.info("EXECUTANDO: 'sincronizar_vendedores'")
-                try:
-                    # Sincroniza a lista completa de vendedores.
-                    api.sincronizar_vendedores()
-                except Exception as e:
-                    logging.error(f"Erro inesperado em 'sincronizar_vendedores': {e}", exc_info=True)
-                # Reagenda a próxima execução.
-                proxima_exec_vendedores = agora + timedelta(minutes=cfg.INTERVALO_VENDEDORES)
-                logging.info(f"AGENDADO: Próxima execução de vendedores para {proxima_exec_vendedores.strftime('%H:%M:%S')}")
-
-            # 5. Tarefa de Compras
-            if agora >= proxima_exec_compras:
-                logging.info(f"\n--- {agora.strftime('%Y-%m-%d %H:%M:%S')} ---")
-                logging.info("EXECUTANDO: Atualização de COMPRAS")
-                try:
-                    # Busca apenas as compras recentes (alteradas/novas) e atualiza o banco.
-                    api.atualizar_compras_recentes()
-                except Exception as e:
-                    logging.error(f"Erro inesperado no ciclo de compras: {e}", exc_info=True)
-                # Reagenda a próxima execução desta tarefa.
-                proxima_exec_compras = agora + timedelta(minutes=cfg.INTERVALO_COMPRAS)
-                logging.info(f"AGENDADO: Próxima execução de compras para {proxima_exec_compras.strftime('%H:%M:%S')}")
-            
-            # 6. Tarefa de Fornecedores (NOVO)
-            if agora >= proxima_exec_fornecedores:
-                logging.info(f"\n--- {agora.strftime('%Y-%m-%d %H:%M:%S')} ---")
-                logging.info("EXECUTANDO: Atualização de FORNECEDORES")
-                try:
-                    # Busca apenas os fornecedores recentes (alterados/novos) e atualiza o banco.
-                    api.atualizar_fornecedores_recentes()
-                except Exception as e:
-                    logging.error(f"Erro inesperado no ciclo de fornecedores: {e}", exc_info=True)
-                # Reagenda a próxima execução desta tarefa.
-                proxima_exec_fornecedores = agora + timedelta(minutes=cfg.INTERVALO_FORNECEDORES)
-                logging.info(f"AGENDADO: Próxima execução de fornecedores para {proxima_exec_fornecedores.strftime('%H:%M:%S')}")
-
-            # Pausa a execução por 60 segundos antes de verificar novamente os agendamentos.
-            # Isso evita que o loop consuma 100% do processador.
-            time.sleep(60)
-
-    except KeyboardInterrupt:
-        # Captura o comando de interrupção (CTRL+C) para encerrar o script de forma limpa.
+        # Roda a agenda indefinidamente: cada tarefa se reagenda ao ser disparada.
+        agenda.run()
+
+    except _EncerramentoSolicitado:
+        # Encerramento pedido por CTRL+C (SIGINT) ou SIGTERM: o script termina de forma limpa.
         logging.info("\n\n=============================================")
-        logging.info("=     ORQUESTRADOR INTERROMPIDO PELO USUÁRIO      =")
+        if _sinal_de_parada == signal.SIGTERM:
+            logging.info("=     ORQUESTRADOR ENCERRADO (SIGTERM)      =")
+        else:
+            logging.info("=     ORQUESTRADOR INTERROMPIDO PELO USUÁRIO      =")
         logging.info("=============================================")
+    finally:
+        # Descarta as tarefas que ainda não começaram e espera as que estão rodando terminarem,
+        # para não encerrar no meio de uma gravação no banco.
+        if any(not futuro.done() for futuro in em_execucao.values()):
+            logging.info("Aguardando as tarefas em execução terminarem...")
+        executor.shutdown(wait=True, cancel_futures=True)
+
+        # Sem tarefas rodando, transfere o conteúdo do WAL para o arquivo do banco e fecha as
+        # conexões do pool: o próximo início não precisa recuperar o WAL.
+        try:
+            with api.engine.connect() as conn:
+                conn.exec_driver_sql('PRAGMA wal_checkpoint(TRUNCATE)')
+            api.engine.dispose()
+        except Exception as e:
+            logging.warning(f"Não foi possível finalizar o WAL do banco de dados: {e}")
 
 # ==============================================================================
 # PONTO DE ENTRADA DO SCRIPT
@@ -0,0 +1,21 @@
+# -*- coding: utf-8 -*-
+
+# ==============================================================================
+# PONTO DE ENTRADA WSGI (PRODUÇÃO)
+# ==============================================================================
+# Usado por servidores WSGI, no lugar do servidor de desenvolvimento do Flask
+# ('python app.py'), que atende uma requisição por vez e roda em modo debug:
+#
+#   Linux:   gunicorn -c gunicorn.conf.py wsgi:app
+#   Windows: waitress-serve --port=5000 --threads=8 wsgi:app
+#
+# As tabelas de agregados que faltarem são criadas e os caches de DataFrames são preenchidos
+# aqui, na importação, valendo para os dois servidores. Com o Gunicorn em modo 'preload'
+# (ver gunicorn.conf.py), isso acontece uma única vez no processo principal e os workers
+# herdam os dados já carregados, compartilhando a mesma memória até que algum deles
+# recarregue o seu cache (copy-on-write do sistema operacional).
+from app import app, carregar_e_processar_dados, carregar_dados_compras, garantir_agregados
+
+garantir_agregados()
+carregar_e_processar_dados()
+carregar_dados_compras()